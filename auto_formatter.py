@@ -1,39 +1,88 @@
 import re
-import nltk
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
+
+try:
+    import nltk
+    NLTK_AVAILABLE = True
+except ImportError:
+    NLTK_AVAILABLE = False
+
+
+_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+(?=[A-Za-z"\'])')
+_ABBR = frozenset({'mr.', 'mrs.', 'dr.', 'prof.', 'inc.', 'ltd.', 'vs.', 'etc.', 'i.e.', 'e.g.'})
+
+
+def _fast_sent_tokenize(text: str) -> List[str]:
+    """Regex sentence splitter for transcription text (no Punkt model)"""
+    sentences = []
+    for piece in _SENT_SPLIT.split(text.strip()):
+        if not piece:
+            continue
+        # Rejoin splits that happened right after an abbreviation
+        if sentences and sentences[-1].rsplit(None, 1)[-1].lower() in _ABBR:
+            sentences[-1] += ' ' + piece
+        else:
+            sentences.append(piece)
+    return sentences
+
+
+@lru_cache(maxsize=4096)
+def _sent_tokenize_cached(text: str) -> Tuple[str, ...]:
+    """Cached Punkt segmentation (tuple so results stay immutable)"""
+    return tuple(nltk.sent_tokenize(text))
+
+
+_NLTK_READY = False
+
+
+def _ensure_nltk():
+    """Check for (and download) Punkt data once per process"""
+    global _NLTK_READY
+    if _NLTK_READY:
+        return
+    if not NLTK_AVAILABLE:
+        raise ImportError("nltk is required for AutoFormatter(fast=False)")
+    try:
+        nltk.data.find('tokenizers/punkt')
+    except LookupError:
+        nltk.download('punkt', quiet=True)
+    _NLTK_READY = True
+
 
 class AutoFormatter:
-    def __init__(self):
-        # Download required NLTK data
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
-    
+    def __init__(self, fast: bool = True):
+        # fast=True uses the regex splitter; fast=False uses NLTK Punkt
+        self.fast = fast
+        if not fast:
+            _ensure_nltk()
+
     def segment_sentences(self, text: str) -> List[str]:
         """Split text into sentences"""
-        return nltk.sent_tokenize(text)
+        if self.fast:
+            return _fast_sent_tokenize(text)
+        return list(_sent_tokenize_cached(text))
     
     def capitalize_sentences(self, sentences: List[str]) -> List[str]:
         """Capitalize first letter of each sentence"""
         return [s[0].upper() + s[1:] if s else s for s in sentences]
     
-    def add_punctuation(self, text: str) -> str:
-        """Add periods to sentences without punctuation"""
-        sentences = self.segment_sentences(text)
+    def _add_punct_list(self, sentences: List[str]) -> List[str]:
+        """Add periods to already-segmented sentences"""
         formatted = []
         
         for sentence in sentences:
             sentence = sentence.strip()
-            if sentence and not sentence[-1] in '.!?':
+            if not sentence:
+                continue
+            if not sentence[-1] in '.!?':
                 sentence += '.'
             formatted.append(sentence)
         
-        return ' '.join(formatted)
+        return formatted
     
-    def create_paragraphs(self, text: str, sentences_per_paragraph: int = 3) -> str:
-        """Group sentences into paragraphs"""
-        sentences = self.segment_sentences(text)
+    def create_paragraphs(self, sentences: List[str], sentences_per_paragraph: int = 3) -> str:
+        """Group already-segmented sentences into paragraphs"""
         paragraphs = []
         
         for i in range(0, len(sentences), sentences_per_paragraph):
@@ -42,24 +91,36 @@ class AutoFormatter:
         
         return '\n\n'.join(paragraphs)
     
-    def convert_to_bullets(self, text: str) -> str:
-        """Convert sentences to bullet points"""
-        sentences = self.segment_sentences(text)
+    def convert_to_bullets(self, sentences: List[str]) -> str:
+        """Turn already-segmented sentences into bullet points"""
         bullets = [f"• {sentence.strip()}" for sentence in sentences if sentence.strip()]
         return '\n'.join(bullets)
     
+    def add_punctuation(self, text: str) -> str:
+        """Add periods to sentences without punctuation"""
+        return ' '.join(self._add_punct_list(self.segment_sentences(text)))
+    
     def format_text(self, text: str, use_paragraphs: bool = False, use_bullets: bool = False) -> str:
         """Apply all formatting"""
-        # Add punctuation
-        text = self.add_punctuation(text)
+        # No sentence terminator means a single sentence: skip segmentation
+        if '.' not in text and '!' not in text and '?' not in text:
+            sentence = text.strip()
+            if not sentence:
+                return ''
+            sentence = sentence[0].upper() + sentence[1:] + '.'
+            return f"• {sentence}" if use_bullets else sentence
         
-        # Segment and capitalize
-        sentences = self.segment_sentences(text)
+        # Segment once, then punctuate and capitalize the sentence list
+        sentences = self._add_punct_list(self.segment_sentences(text))
         sentences = self.capitalize_sentences(sentences)
         
         if use_bullets:
-            return self.convert_to_bullets(' '.join(sentences))
+            return self.convert_to_bullets(sentences)
         elif use_paragraphs:
-            return self.create_paragraphs(' '.join(sentences))
+            return self.create_paragraphs(sentences)
         else:
-            return ' '.join(sentences)
\ No newline at end of file
+            return ' '.join(sentences)
+
+
+# Shared instance so callers don't re-run setup per request
+DEFAULT_FORMATTER = AutoFormatter()
\ No newline at end of file
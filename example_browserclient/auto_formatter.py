@@ -1,76 +1,141 @@
 import re
-import nltk
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
 
-class AutoFormatter:
-    def __init__(self):
-        # Download required NLTK data
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
-        
+try:
+    import nltk
+    NLTK_AVAILABLE = True
+except ImportError:
+    NLTK_AVAILABLE = False
+
+
+_WS_RE = re.compile(r'\s+')
+_DOTS_RE = re.compile(r'\.{2,}')
+_BANGS_RE = re.compile(r'!{2,}')
+_Q_RE = re.compile(r'\?{2,}')
+_I_RE = re.compile(r'\bi\b')
+_CAP_AFTER_PUNCT = re.compile(r'([.!?]\s+)([a-z])')
+
+
+_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+(?=[A-Za-z"\'])')
+
+# Word lists, built once at import time
+_ABBREVIATIONS = frozenset({'mr', 'mrs', 'dr', 'prof', 'inc', 'ltd', 'vs', 'etc', 'i.e', 'e.g'})
+_ABBR = frozenset(abbr + '.' for abbr in _ABBREVIATIONS)
+_QUESTION_WORDS = frozenset({'what', 'when', 'where', 'who', 'why', 'how', 'which', 'whose'})
+_AUX_VERBS = frozenset({'is', 'are', 'was', 'were', 'do', 'does', 'did', 'can', 'could', 'will', 'would', 'should'})
+_EXCL_WORDS = frozenset({'wow', 'amazing', 'great', 'terrible', 'help'})
+_TRANSITIONS = frozenset({'however', 'meanwhile', 'furthermore', 'moreover'})
+_EDGE_PUNCT = '.,!?;:"\''
+
+
+def _fast_sent_tokenize(text: str) -> List[str]:
+    """Regex sentence splitter for transcription text (no Punkt model)"""
+    sentences = []
+    for piece in _SENT_SPLIT.split(text.strip()):
+        if not piece:
+            continue
+        # Rejoin splits that happened right after an abbreviation
+        if sentences and sentences[-1].rsplit(None, 1)[-1].lower() in _ABBR:
+            sentences[-1] += ' ' + piece
+        else:
+            sentences.append(piece)
+    return sentences
+
+
+@lru_cache(maxsize=4096)
+def _sent_tokenize_cached(text: str) -> Tuple[str, ...]:
+    """Cached Punkt segmentation (tuple so results stay immutable)"""
+    return tuple(nltk.sent_tokenize(text))
+
+
+_NLTK_READY = False
+
+
+def _ensure_nltk():
+    """Check for (and download) Punkt data once per process"""
+    global _NLTK_READY
+    if _NLTK_READY:
+        return
+    if not NLTK_AVAILABLE:
+        raise ImportError("nltk is required for AutoFormatter(fast=False)")
+    for resource in ('punkt', 'punkt_tab'):
         try:
-            nltk.data.find('tokenizers/punkt_tab')
+            nltk.data.find(f'tokenizers/{resource}')
         except LookupError:
-            nltk.download('punkt_tab')
+            nltk.download(resource, quiet=True)
+    _NLTK_READY = True
+
+
+class AutoFormatter:
+    def __init__(self, fast: bool = True):
+        # fast=True uses the regex splitter; fast=False uses NLTK Punkt
+        self.fast = fast
+        if not fast:
+            _ensure_nltk()
         
         # Common abbreviations that shouldn't end sentences
-        self.abbreviations = {'mr', 'mrs', 'dr', 'prof', 'inc', 'ltd', 'vs', 'etc', 'i.e', 'e.g'}
+        self.abbreviations = _ABBREVIATIONS
+        self._abbr_endings = _ABBR
         
         # Question indicators
-        self.question_words = {'what', 'when', 'where', 'who', 'why', 'how', 'which', 'whose'}
+        self.question_words = _QUESTION_WORDS
+        
+        # Words that mark a sentence as an exclamation
+        self._excl_words = _EXCL_WORDS
     
     def clean_text(self, text: str) -> str:
         """Clean and normalize text"""
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
+        # Remove extra whitespace (split/join is faster than the regex for ASCII)
+        if text.isascii():
+            text = ' '.join(text.split())
+        else:
+            text = _WS_RE.sub(' ', text)
         # Remove multiple punctuation
-        text = re.sub(r'[.]{2,}', '.', text)
-        text = re.sub(r'[!]{2,}', '!', text)
-        text = re.sub(r'[?]{2,}', '?', text)
+        text = _DOTS_RE.sub('.', text)
+        text = _BANGS_RE.sub('!', text)
+        text = _Q_RE.sub('?', text)
         return text.strip()
     
     def segment_sentences(self, text: str) -> List[str]:
         """Enhanced sentence segmentation"""
         text = self.clean_text(text)
         
-        # Use NLTK for initial segmentation
-        sentences = nltk.sent_tokenize(text)
+        # Initial segmentation (regex splitter or NLTK Punkt)
+        if self.fast:
+            sentences = _fast_sent_tokenize(text)
+        else:
+            sentences = _sent_tokenize_cached(text)
         
         # Post-process to fix common errors
         fixed_sentences = []
+        last_word = ''  # lowercased final token of fixed_sentences[-1]
         for sentence in sentences:
             sentence = sentence.strip()
             if sentence:
                 # Check if previous sentence ended with abbreviation
-                words = sentence.lower().split()
-                if (fixed_sentences and 
-                    len(words) > 0 and 
-                    any(abbr in fixed_sentences[-1].lower() for abbr in self.abbreviations)):
+                if fixed_sentences and last_word in self._abbr_endings:
                     # Merge with previous sentence
                     fixed_sentences[-1] += ' ' + sentence
                 else:
                     fixed_sentences.append(sentence)
+                last_word = sentence.rsplit(None, 1)[-1].lower()
         
         return fixed_sentences
     
-    def detect_questions(self, sentence: str) -> bool:
-        """Detect if sentence should be a question"""
-        words = sentence.lower().split()
+    def detect_questions(self, sentence: str, words: List[str] = None) -> bool:
+        """Detect if sentence should be a question (words: optional lowercased tokens)"""
+        if words is None:
+            words = sentence.lower().split()
         if not words:
             return False
         
         # Check for question words at start
-        if words[0] in self.question_words:
+        if words[0] in _QUESTION_WORDS:
             return True
         
         # Check for inverted word order (auxiliary verbs)
-        aux_verbs = {'is', 'are', 'was', 'were', 'do', 'does', 'did', 'can', 'could', 'will', 'would', 'should'}
-        if len(words) > 1 and words[0] in aux_verbs:
-            return True
-        
-        return False
+        return len(words) > 1 and words[0] in _AUX_VERBS
     
     def smart_punctuation(self, sentences: List[str]) -> List[str]:
         """Add intelligent punctuation"""
@@ -86,11 +151,12 @@ class AutoFormatter:
                 sentence = sentence[:-1].strip()
             
             if sentence:
+                words_lower = sentence.lower().split()
                 # Detect question
-                if self.detect_questions(sentence):
+                if self.detect_questions(sentence, words_lower):
                     sentence += '?'
-                # Detect exclamation (simple heuristic)
-                elif any(word in sentence.lower() for word in ['wow', 'amazing', 'great', 'terrible', 'help']):
+                # Detect exclamation (simple heuristic, whole words only)
+                elif not self._excl_words.isdisjoint(w.strip(_EDGE_PUNCT) for w in words_lower):
                     sentence += '!'
                 else:
                     sentence += '.'
@@ -101,24 +167,26 @@ class AutoFormatter:
     
     def capitalize_sentences(self, sentences: List[str]) -> List[str]:
         """Enhanced capitalization"""
-        formatted = []
+        # Capitalize first letter
+        formatted = [sentence[0].upper() + sentence[1:] for sentence in sentences if sentence]
+        if not formatted:
+            return formatted
         
-        for sentence in sentences:
-            if not sentence:
-                continue
-            
-            # Capitalize first letter
-            sentence = sentence[0].upper() + sentence[1:] if len(sentence) > 1 else sentence.upper()
-            
+        # Run the regex passes once over all sentences. NUL is neither
+        # whitespace nor a word character, so no match spans two sentences.
+        joined = '\x00'.join(formatted)
+        if joined.count('\x00') != len(formatted) - 1:
+            joined = None  # NUL inside a sentence: fall back to per-sentence passes
+        
+        def capitalize(text):
             # Capitalize 'I'
-            sentence = re.sub(r'\bi\b', 'I', sentence)
-            
+            text = _I_RE.sub('I', text)
             # Capitalize after punctuation
-            sentence = re.sub(r'([.!?]\s+)([a-z])', lambda m: m.group(1) + m.group(2).upper(), sentence)
-            
-            formatted.append(sentence)
+            return _CAP_AFTER_PUNCT.sub(lambda m: m.group(1) + m.group(2).upper(), text)
         
-        return formatted
+        if joined is None:
+            return [capitalize(sentence) for sentence in formatted]
+        return capitalize(joined).split('\x00')
     
     def create_paragraphs(self, sentences: List[str], sentences_per_paragraph: int = 3) -> str:
         """Smart paragraph creation"""
@@ -128,17 +196,19 @@ class AutoFormatter:
         paragraphs = []
         current_paragraph = []
         
+        last = len(sentences) - 1
         for i, sentence in enumerate(sentences):
             current_paragraph.append(sentence)
             
-            # Create paragraph break conditions
+            # Create paragraph break conditions (transition words match whole
+            # words; the sentence is only lowercased when that check runs)
             should_break = (
                 len(current_paragraph) >= sentences_per_paragraph or
-                (i < len(sentences) - 1 and 
-                 any(word in sentence.lower() for word in ['however', 'meanwhile', 'furthermore', 'moreover']))
+                (i < last and
+                 not _TRANSITIONS.isdisjoint(w.strip(_EDGE_PUNCT) for w in sentence.lower().split()))
             )
             
-            if should_break or i == len(sentences) - 1:
+            if should_break or i == last:
                 paragraphs.append(' '.join(current_paragraph))
                 current_paragraph = []
         
@@ -149,6 +219,12 @@ class AutoFormatter:
         if not text or not text.strip():
             return text
         
+        # No sentence terminator means a single sentence (the common partial
+        # transcription case), so skip segmentation entirely
+        if '.' not in text and '!' not in text and '?' not in text:
+            sentences = self.smart_punctuation([self.clean_text(text)])
+            return ' '.join(self.capitalize_sentences(sentences))
+        
         # Clean input
         text = self.clean_text(text)
         
@@ -168,9 +244,13 @@ class AutoFormatter:
             return ' '.join(sentences)
 
 
+# Shared instance so callers don't re-run setup per request
+DEFAULT_FORMATTER = AutoFormatter()
+
+
 # Test cases
 if __name__ == '__main__':
-    formatter = AutoFormatter()
+    formatter = DEFAULT_FORMATTER
     
     test_cases = [
         # Basic formatting
@@ -225,4 +305,12 @@ if __name__ == '__main__':
     punctuated = formatter.smart_punctuation(test_sentences)
     print(f"\nPunctuation: {punctuated}")
     
+    # Punkt segmentation (opt-in) and its tokenizer cache
+    if NLTK_AVAILABLE:
+        punkt_formatter = AutoFormatter(fast=False)
+        for _ in range(2):
+            punkt_sentences = punkt_formatter.segment_sentences(test_text)
+        print(f"\nPunkt segmentation: {punkt_sentences}")
+        print(f"Tokenizer cache: {_sent_tokenize_cached.cache_info()}")
+    
     print("\n=== Tests Complete ===")
\ No newline at end of file
@@ -19,18 +19,18 @@ def clear_database():
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
-    # Get current counts
-    cursor.execute('SELECT COUNT(*) FROM transcriptions')
-    trans_count = cursor.fetchone()[0]
-    
-    cursor.execute('SELECT COUNT(*) FROM feedback')
-    feedback_count = cursor.fetchone()[0]
-    
-    cursor.execute('SELECT COUNT(*) FROM corrections')
-    corrections_count = cursor.fetchone()[0]
-    
-    cursor.execute('SELECT COUNT(*) FROM learned_rules')
-    rules_count = cursor.fetchone()[0]
+    # Get current counts (one statement)
+    cursor.execute('''
+        SELECT 'transcriptions', COUNT(*) FROM transcriptions
+        UNION ALL SELECT 'feedback', COUNT(*) FROM feedback
+        UNION ALL SELECT 'corrections', COUNT(*) FROM corrections
+        UNION ALL SELECT 'learned_rules', COUNT(*) FROM learned_rules
+    ''')
+    counts = dict(cursor.fetchall())
+    trans_count = counts['transcriptions']
+    feedback_count = counts['feedback']
+    corrections_count = counts['corrections']
+    rules_count = counts['learned_rules']
     
     print(f"\nCurrent database contents:")
     print(f"  - Transcriptions: {trans_count}")
@@ -46,28 +46,31 @@ def clear_database():
     print("\n⚠️  WARNING: This will delete ALL data!")
     print("=" * 60)
     
-    # Clear all tables
+    # Clear all tables in a single transaction
     print("\nClearing tables...")
-    cursor.execute('DELETE FROM rule_applications')
-    print("  ✓ Cleared rule_applications")
-    
-    cursor.execute('DELETE FROM learned_rules')
-    print("  ✓ Cleared learned_rules")
-    
-    cursor.execute('DELETE FROM corrections')
-    print("  ✓ Cleared corrections")
-    
-    cursor.execute('DELETE FROM feedback')
-    print("  ✓ Cleared feedback")
-    
-    cursor.execute('DELETE FROM transcriptions')
-    print("  ✓ Cleared transcriptions")
-    
-    # Reset auto-increment counters
-    cursor.execute('DELETE FROM sqlite_sequence')
-    print("  ✓ Reset ID counters")
-    
-    conn.commit()
+    with conn:
+        cursor.execute('DELETE FROM rule_applications')
+        print("  ✓ Cleared rule_applications")
+        
+        cursor.execute('DELETE FROM learned_rules')
+        print("  ✓ Cleared learned_rules")
+        
+        cursor.execute('DELETE FROM corrections')
+        print("  ✓ Cleared corrections")
+        
+        cursor.execute('DELETE FROM feedback')
+        print("  ✓ Cleared feedback")
+        
+        cursor.execute('DELETE FROM transcriptions')
+        print("  ✓ Cleared transcriptions")
+        
+        # Reset auto-increment counters
+        cursor.execute('DELETE FROM sqlite_sequence')
+        print("  ✓ Reset ID counters")
+    
+    # Reclaim the freed pages
+    conn.execute('VACUUM')
+    print("  ✓ Compacted database file")
     conn.close()
     
     print("\n" + "=" * 60)
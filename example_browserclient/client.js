@@ -190,8 +190,13 @@ document.addEventListener('DOMContentLoaded', function() {
             }));
         };
 
-        socket.onmessage = function(event) {
-            let data = JSON.parse(event.data);
+        socket.onmessage = function onMessage(event) {
+            let data = typeof event.data === 'string' ? JSON.parse(event.data) : event.data;
+            if (data.type === 'batch') {
+                // Several messages sent by the server in one frame
+                data.messages.forEach(message => onMessage({ data: message }));
+                return;
+            }
             console.log('Received:', data.type);
 
             if (data.type === 'recording_started') {
@@ -303,8 +308,13 @@ document.addEventListener('DOMContentLoaded', function() {
         }));
     };
 
-    socket.onmessage = function(event) {
-        let data = JSON.parse(event.data);
+    socket.onmessage = function onMessage(event) {
+        let data = typeof event.data === 'string' ? JSON.parse(event.data) : event.data;
+        if (data.type === 'batch') {
+            // Several messages sent by the server in one frame
+            data.messages.forEach(message => onMessage({ data: message }));
+            return;
+        }
         console.log('Received:', data.type);
 
         if (data.type === 'recording_started') {
@@ -3,16 +3,81 @@ SQLite Database for storing transcriptions, feedback, and learning data
 """
 import sqlite3
 import json
+import threading
 from datetime import datetime
 from pathlib import Path
 
+from rule_matcher import apply_rule_matcher, build_rule_matcher
+
 
 class TranscriptionDatabase:
+    # Hot-path statements; sqlite3 caches the prepared form per SQL string
+    _INS_TRANSCRIPTION = '''
+        INSERT INTO transcriptions (
+            original_audio_text, cleaned_text, filtered_text,
+            grammar_corrected, tone_transformed, final_output,
+            tone_mode, latency_ms, transcription_time_ms, processing_time_ms
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    _INS_FEEDBACK = '''
+        INSERT INTO feedback (transcription_id, feedback_type, original_text, output_text, tone_mode)
+        VALUES (?, ?, ?, ?, ?)
+    '''
+    _INS_CORRECTION = '''
+        INSERT INTO corrections (
+            transcription_id, original_text, wrong_output, 
+            corrected_output, correction_type, tone_mode
+        ) VALUES (?, ?, ?, ?, ?, ?)
+    '''
+    _UPSERT_RULE = '''
+        INSERT INTO learned_rules (rule_key, from_word, to_word, tone_mode)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(rule_key) DO UPDATE
+        SET usage_count = usage_count + 1, last_used = CURRENT_TIMESTAMP
+    '''
+    
     def __init__(self, db_path='transcription_data.db'):
         self.db_path = db_path
         self.conn = None
+        self._batch_depth = 0  # > 0 while inside a `with db:` batch
+        self._rule_matchers = {}  # tone_mode -> compiled learned-rule matcher
+        self._rules_cache = {}  # (tone_mode, min_usage) -> rule rows
+        self._rules_version = 0  # bumped on every learned_rules write
+        self._rules_lock = threading.Lock()
         self.init_database()
     
+    def __enter__(self):
+        """Batch writes: commit once when the block exits"""
+        self._batch_depth += 1
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            if exc_type is None:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+                self._invalidate_rules()
+        return False
+    
+    def _commit(self):
+        """Commit now unless a batch is open"""
+        if self._batch_depth == 0:
+            self.conn.commit()
+    
+    def _invalidate_rules(self):
+        """Drop cached rules/matchers after learned_rules changes"""
+        with self._rules_lock:
+            self._rules_version += 1
+            self._rules_cache.clear()
+            self._rule_matchers.clear()
+    
+    def flush(self):
+        """Commit any pending writes"""
+        if self.conn:
+            self.conn.commit()
+    
     def init_database(self):
         """Initialize database with all required tables"""
         self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
@@ -20,6 +85,13 @@ class TranscriptionDatabase:
         
         cursor = self.conn.cursor()
         
+        # WAL journal + relaxed sync: commits no longer fsync on every write
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.execute('PRAGMA cache_size=-20000')
+        cursor.execute('PRAGMA mmap_size=268435456')
+        
         # Table 1: Transcriptions
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS transcriptions (
@@ -95,19 +167,18 @@ class TranscriptionDatabase:
             )
         ''')
         
+        # Indexes for the hot lookups (feedback stats, rule fetch, exact match)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_feedback_type ON feedback(feedback_type)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_rules_mode_usage ON learned_rules(tone_mode, usage_count DESC)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_corr_lower_orig ON corrections(LOWER(original_text), tone_mode)')
+        
         self.conn.commit()
         print("✓ Database initialized successfully")
     
-    def store_transcription(self, data):
-        """Store a complete transcription with all processing stages"""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT INTO transcriptions (
-                original_audio_text, cleaned_text, filtered_text,
-                grammar_corrected, tone_transformed, final_output,
-                tone_mode, latency_ms, transcription_time_ms, processing_time_ms
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+    @staticmethod
+    def _transcription_params(data):
+        """Pack a transcription dict into _INS_TRANSCRIPTION parameters"""
+        return (
             data.get('original'),
             data.get('cleaned'),
             data.get('filtered'),
@@ -118,90 +189,103 @@ class TranscriptionDatabase:
             data.get('latency_ms'),
             data.get('transcription_time_ms'),
             data.get('processing_time_ms')
-        ))
-        self.conn.commit()
+        )
+    
+    def store_transcription(self, data):
+        """Store a complete transcription with all processing stages"""
+        cursor = self.conn.cursor()
+        cursor.execute(self._INS_TRANSCRIPTION, self._transcription_params(data))
+        self._commit()
         return cursor.lastrowid
     
+    def store_transcriptions_bulk(self, rows):
+        """Store many transcriptions with one statement and one commit"""
+        cursor = self.conn.cursor()
+        cursor.executemany(self._INS_TRANSCRIPTION, [self._transcription_params(data) for data in rows])
+        self._commit()
+        return cursor.rowcount
+    
     def store_feedback(self, feedback_type, original, output, tone_mode, transcription_id=None):
         """Store user feedback (approve/reject)"""
         cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT INTO feedback (transcription_id, feedback_type, original_text, output_text, tone_mode)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (transcription_id, feedback_type, original, output, tone_mode))
-        self.conn.commit()
+        cursor.execute(self._INS_FEEDBACK, (transcription_id, feedback_type, original, output, tone_mode))
+        self._commit()
         return cursor.lastrowid
     
     def store_correction(self, original, wrong_output, corrected_output, correction_type, tone_mode, transcription_id=None):
         """Store a correction (manual or ChatGPT)"""
         cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT INTO corrections (
-                transcription_id, original_text, wrong_output, 
-                corrected_output, correction_type, tone_mode
-            ) VALUES (?, ?, ?, ?, ?, ?)
-        ''', (transcription_id, original, wrong_output, corrected_output, correction_type, tone_mode))
-        self.conn.commit()
+        cursor.execute(self._INS_CORRECTION, (transcription_id, original, wrong_output, corrected_output, correction_type, tone_mode))
+        correction_id = cursor.lastrowid
         
         # Extract and store learned rules
         self._extract_and_store_rules(original, corrected_output, tone_mode)
+        self._commit()
         
-        return cursor.lastrowid
+        return correction_id
     
     def _extract_and_store_rules(self, original, corrected, tone_mode):
         """Extract word-level rules and store them"""
         original_words = original.lower().split()
         corrected_words = corrected.lower().split()
         
-        cursor = self.conn.cursor()
+        # One row per differing word position (zip stops at the shorter text)
+        rows = [
+            (f"{word}→{corrected_word}:{tone_mode}", word, corrected_word, tone_mode)
+            for word, corrected_word in zip(original_words, corrected_words)
+            if word != corrected_word
+        ]
+        if not rows:
+            return
         
-        for i, word in enumerate(original_words):
-            if i < len(corrected_words) and word != corrected_words[i]:
-                rule_key = f"{word}→{corrected_words[i]}:{tone_mode}"
-                
-                # Check if rule exists
-                cursor.execute('SELECT id, usage_count FROM learned_rules WHERE rule_key = ?', (rule_key,))
-                existing = cursor.fetchone()
-                
-                if existing:
-                    # Update existing rule
-                    cursor.execute('''
-                        UPDATE learned_rules 
-                        SET usage_count = usage_count + 1, last_used = CURRENT_TIMESTAMP
-                        WHERE id = ?
-                    ''', (existing['id'],))
-                else:
-                    # Create new rule
-                    cursor.execute('''
-                        INSERT INTO learned_rules (rule_key, from_word, to_word, tone_mode)
-                        VALUES (?, ?, ?, ?)
-                    ''', (rule_key, word, corrected_words[i], tone_mode))
-        
-        self.conn.commit()
+        # Insert new rules, bump usage on existing ones
+        self.conn.executemany(self._UPSERT_RULE, rows)
+        self._invalidate_rules()
     
     def get_learned_rules(self, tone_mode, min_usage=2):
-        """Get active learned rules for a tone mode"""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT * FROM learned_rules 
-            WHERE tone_mode = ? AND usage_count >= ?
-            ORDER BY usage_count DESC
-        ''', (tone_mode, min_usage))
-        return cursor.fetchall()
+        """Get active learned rules for a tone mode (cached until rules change)"""
+        key = (tone_mode, min_usage)
+        with self._rules_lock:
+            rules = self._rules_cache.get(key)
+            if rules is None:
+                cursor = self.conn.cursor()
+                cursor.execute('''
+                    SELECT * FROM learned_rules 
+                    WHERE tone_mode = ? AND usage_count >= ?
+                    ORDER BY usage_count DESC
+                ''', (tone_mode, min_usage))
+                rules = self._rules_cache[key] = cursor.fetchall()
+        return rules
     
-    def apply_learned_rules(self, text, tone_mode):
-        """Apply learned rules to text"""
-        rules = self.get_learned_rules(tone_mode)
-        result = text
+    def _get_rule_matcher(self, tone_mode):
+        """Build (and cache) a single-pass matcher over the active rules"""
+        with self._rules_lock:
+            if tone_mode in self._rule_matchers:
+                return self._rule_matchers[tone_mode]
+            version = self._rules_version
+        
+        # Rules come ordered by usage, so the most used target wins per word
+        replacements = {}
+        for rule in self.get_learned_rules(tone_mode):
+            replacements.setdefault(rule['from_word'], rule['to_word'])
         
-        for rule in rules:
-            result = result.replace(rule['from_word'], rule['to_word'])
+        matcher = build_rule_matcher(replacements)
         
-        return result if result != text else None
+        # A rule write during the build makes this matcher stale: use it for
+        # this call but don't cache it
+        with self._rules_lock:
+            if self._rules_version == version:
+                self._rule_matchers[tone_mode] = matcher
+        return matcher
+    
+    def apply_learned_rules(self, text, tone_mode):
+        """Apply learned rules to text (whole words, leftmost-longest, one pass)"""
+        return apply_rule_matcher(self._get_rule_matcher(tone_mode), text)
     
     def check_exact_match(self, original, tone_mode):
         """Check if we have an exact correction for this input"""
         cursor = self.conn.cursor()
+        # LOWER(original_text) matches idx_corr_lower_orig, so this is an index lookup
         cursor.execute('''
             SELECT corrected_output, COUNT(*) as count
             FROM corrections
@@ -213,16 +297,9 @@ class TranscriptionDatabase:
         result = cursor.fetchone()
         return result['corrected_output'] if result else None
     
-    def get_accuracy_stats(self):
-        """Calculate accuracy based on approvals vs rejections"""
-        cursor = self.conn.cursor()
-        
-        cursor.execute('SELECT COUNT(*) as count FROM feedback WHERE feedback_type = "approve"')
-        approved = cursor.fetchone()['count']
-        
-        cursor.execute('SELECT COUNT(*) as count FROM feedback WHERE feedback_type = "reject"')
-        rejected = cursor.fetchone()['count']
-        
+    @staticmethod
+    def _accuracy_summary(approved, rejected):
+        """Build the accuracy stats dict from approval/rejection counts"""
         total = approved + rejected
         accuracy = (approved / total * 100) if total > 0 else 0
         
@@ -233,26 +310,35 @@ class TranscriptionDatabase:
             'accuracy': f"{accuracy:.1f}%"
         }
     
-    def get_stats(self):
-        """Get comprehensive statistics"""
+    def get_accuracy_stats(self):
+        """Calculate accuracy based on approvals vs rejections"""
         cursor = self.conn.cursor()
         
-        cursor.execute('SELECT COUNT(*) as count FROM transcriptions')
-        total_transcriptions = cursor.fetchone()['count']
-        
-        cursor.execute('SELECT COUNT(*) as count FROM corrections')
-        total_corrections = cursor.fetchone()['count']
+        cursor.execute('SELECT feedback_type, COUNT(*) as count FROM feedback GROUP BY feedback_type')
+        counts = {row['feedback_type']: row['count'] for row in cursor.fetchall()}
         
-        cursor.execute('SELECT COUNT(*) as count FROM learned_rules WHERE usage_count >= 2')
-        active_rules = cursor.fetchone()['count']
+        return self._accuracy_summary(counts.get('approve', 0), counts.get('reject', 0))
+    
+    def get_stats(self):
+        """Get comprehensive statistics"""
+        cursor = self.conn.cursor()
         
-        accuracy_stats = self.get_accuracy_stats()
+        # All counters in one statement
+        cursor.execute('''
+            SELECT
+                (SELECT COUNT(*) FROM transcriptions) AS total_transcriptions,
+                (SELECT COUNT(*) FROM corrections) AS total_corrections,
+                (SELECT COUNT(*) FROM learned_rules WHERE usage_count >= 2) AS active_rules,
+                (SELECT COUNT(*) FROM feedback WHERE feedback_type = 'approve') AS approved,
+                (SELECT COUNT(*) FROM feedback WHERE feedback_type = 'reject') AS rejected
+        ''')
+        row = cursor.fetchone()
         
         return {
-            'total_transcriptions': total_transcriptions,
-            'total_corrections': total_corrections,
-            'active_rules': active_rules,
-            **accuracy_stats
+            'total_transcriptions': row['total_transcriptions'],
+            'total_corrections': row['total_corrections'],
+            'active_rules': row['active_rules'],
+            **self._accuracy_summary(row['approved'], row['rejected'])
         }
     
     def get_recent_transcriptions(self, limit=10):
@@ -296,4 +382,5 @@ class TranscriptionDatabase:
     def close(self):
         """Close database connection"""
         if self.conn:
+            self.conn.commit()
             self.conn.close()
@@ -1,54 +1,118 @@
 import re
 
+_ws_re = re.compile(r'\s+')
+
+# Common filler words and disfluencies
+_FILLERS = frozenset({
+    'umm', 'uhh', 'ehh', 'uh', 'um', 'er', 'ah', 'oh',
+    'you know', 'like', 'so', 'well', 'actually', 'basically',
+    'literally', 'totally', 'really', 'very', 'just', 'kind of',
+    'sort of', 'i mean', 'you see', 'right', 'okay', 'alright'
+})
+
+# Filler lookups, all derived from _FILLERS: word sets for the token pass in
+# clean_text and regexes for remove_fillers
+_SINGLE_FILLERS = frozenset(f for f in _FILLERS if ' ' not in f)
+_PHRASE_FILLERS = frozenset(tuple(f.split()) for f in _FILLERS if ' ' in f)
+_PHRASE_SIZES = sorted({len(p) for p in _PHRASE_FILLERS}, reverse=True)
+
+
+def _compile_fillers(phrases):
+    """Compile an alternation matching any of the given word tuples
+    
+    Longest first so longer phrases win; whitespace lookarounds keep
+    matches on whole tokens only.
+    """
+    alternatives = [
+        r'\s+'.join(map(re.escape, phrase))
+        for phrase in sorted(phrases, key=lambda p: len(' '.join(p)), reverse=True)
+    ]
+    return re.compile(r'(?<!\S)(?:' + '|'.join(alternatives) + r')(?!\S)', re.IGNORECASE)
+
+
+_single_re = _compile_fillers((f,) for f in _SINGLE_FILLERS)
+_multi_re = _compile_fillers(_PHRASE_FILLERS)
+
+# Punctuation a stutter run may end on ("no no no?" -> "no?")
+_STUTTER_PUNCT = '.,!?;:'
+
+
+def _collapse_stutters(tokens, lows):
+    """Indices of tokens left after collapsing runs of 3+ repeated words
+    
+    A collapsed run keeps its first token; trailing punctuation on the last
+    token of the run is moved onto it (tokens and lows are updated in place).
+    """
+    kept = []
+    n = len(tokens)
+    i = 0
+    while i < n:
+        word = lows[i]
+        j = i + 1
+        # Only the last token of a run may carry punctuation
+        while j < n and lows[j - 1] == word and lows[j].rstrip(_STUTTER_PUNCT) == word:
+            j += 1
+        if j - i >= 3:
+            last = tokens[j - 1]
+            punct = last[len(last.rstrip(_STUTTER_PUNCT)):]
+            tokens[i] += punct
+            lows[i] += punct
+            kept.append(i)
+        else:
+            kept.extend(range(i, j))
+        i = j
+    return kept
+
+
 class DisfluencyFilter:
     def __init__(self):
-        # Common filler words and disfluencies
-        self.fillers = {
-            'umm', 'uhh', 'ehh', 'uh', 'um', 'er', 'ah', 'oh',
-            'you know', 'like', 'so', 'well', 'actually', 'basically',
-            'literally', 'totally', 'really', 'very', 'just', 'kind of',
-            'sort of', 'i mean', 'you see', 'right', 'okay', 'alright'
-        }
+        self.fillers = _FILLERS
         
         # Pattern for repeated words (stuttering)
         self.stutter_pattern = re.compile(r'\b(\w+)(\s+\1){2,}\b', re.IGNORECASE)
         
     def remove_fillers(self, text: str) -> str:
         """Remove filler words and phrases"""
-        words = text.lower().split()
-        filtered = []
-        i = 0
-        
-        while i < len(words):
-            # Check for multi-word fillers
-            found_filler = False
-            for filler in sorted(self.fillers, key=len, reverse=True):
-                filler_words = filler.split()
-                if (i + len(filler_words) <= len(words) and 
-                    ' '.join(words[i:i+len(filler_words)]) == filler):
-                    i += len(filler_words)
-                    found_filler = True
-                    break
-            
-            if not found_filler:
-                filtered.append(words[i])
-                i += 1
-        
-        return ' '.join(filtered)
+        text = _multi_re.sub(' ', text.lower())
+        text = _single_re.sub(' ', text)
+        return _ws_re.sub(' ', text).strip()
     
-    def remove_stutters(self, text: str) -> str:
-        """Remove stuttering (repeated words)"""
-        return self.stutter_pattern.sub(r'\1', text)
+    def remove_stutters(self, text: str, use_regex: bool = False) -> str:
+        """Remove stuttering (a word repeated 3+ times collapses to one)"""
+        if use_regex:
+            return self.stutter_pattern.sub(r'\1', text)
+        
+        # Single linear pass over tokens; also normalizes whitespace
+        tokens = text.split()
+        lows = [token.lower() for token in tokens]
+        return ' '.join(tokens[i] for i in _collapse_stutters(tokens, lows))
     
     def clean_text(self, text: str) -> str:
         """Apply all disfluency removal"""
-        # Remove stutters first
-        text = self.remove_stutters(text)
-        # Remove fillers
-        text = self.remove_fillers(text)
-        # Clean up extra spaces
-        text = re.sub(r'\s+', ' ', text).strip()
+        # Split and lowercase once, then collapse stutters and drop fillers
+        # on the token list (original casing is kept)
+        tokens = text.split()
+        lows = [token.lower() for token in tokens]
+        
+        # Stutters: runs of 3+ repeated words keep only the first
+        kept = _collapse_stutters(tokens, lows)
+        
+        # Fillers: multi-word phrases take priority over single words
+        result = []
+        k = 0
+        m = len(kept)
+        while k < m:
+            for size in _PHRASE_SIZES:
+                if k + size <= m and tuple(lows[idx] for idx in kept[k:k + size]) in _PHRASE_FILLERS:
+                    k += size
+                    break
+            else:
+                if lows[kept[k]] not in _SINGLE_FILLERS:
+                    result.append(tokens[kept[k]])
+                k += 1
+        
         # Capitalize first letter
+        text = ' '.join(result)
         if text:
             text = text[0].upper() + text[1:]
         return text
\ No newline at end of file
@@ -6,14 +6,204 @@ Self-Learning Feedback System with Auto-Improvement
 """
 import json
 import os
+import re
+import sqlite3
+import time
+from collections import deque
 from datetime import datetime
 import requests
 
+from rule_matcher import apply_rule_matcher, build_rule_matcher
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Basic tone transformations for get_simple_correction
+_SIMPLE_CORRECTIONS = {
+    'formal': {
+        'gotta': 'must',
+        'wanna': 'want to',
+        'gonna': 'going to',
+        'yeah': 'yes',
+        'nope': 'no',
+        'hey': 'hello',
+        'dude': 'sir/madam',
+        'bruh': '',
+        'kinda': 'somewhat',
+        'sorta': 'somewhat'
+    },
+    'casual': {
+        'must': 'gotta',
+        'want to': 'wanna',
+        'going to': 'gonna'
+    }
+}
+_SIMPLE_CORRECTION_RES = {
+    tone_mode: re.compile(r'\b(?:' + '|'.join(map(re.escape, sorted(words, key=len, reverse=True))) + r')\b')
+    for tone_mode, words in _SIMPLE_CORRECTIONS.items()
+}
+
 
 class FeedbackMemory:
+    # Most recent entries kept per history list (older ones are dropped)
+    MAX_CORRECTIONS = 10000
+    MAX_FEEDBACK = 10000  # each for approved and rejected
+    
     def __init__(self, memory_file='feedback_memory.json'):
         self.memory_file = memory_file
-        self.memory = self.load_memory()
+        # Feedback is persisted in SQLite next to the JSON file; every event
+        # is one INSERT instead of a rewrite of the whole history
+        self.db_file = os.path.splitext(memory_file)[0] + '.db'
+        self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self._init_db()
+        if self._db_is_empty() and os.path.exists(self.memory_file):
+            self._migrate_json(self.load_memory())
+        self.memory = self._load_from_db()
+        # (normalized original, tone_mode) -> user corrections in insertion
+        # order; the first one wins, same as scanning the corrections list
+        self._exact_index = {}
+        for correction in self.memory['corrections']:
+            self._index_correction(correction)
+        self._automata = {}  # tone_mode -> compiled rule matcher
+        self._rules_dirty = False  # set when _extract_rules changes a rule
+    
+    def _init_db(self):
+        """Create the feedback tables"""
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS corrections (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL,
+                original TEXT NOT NULL,
+                original_lower TEXT NOT NULL,
+                system_output TEXT,
+                user_correction TEXT NOT NULL,
+                tone_mode TEXT NOT NULL
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS rules (
+                key TEXT PRIMARY KEY,
+                count INTEGER NOT NULL,
+                examples_json TEXT NOT NULL,
+                tone_mode TEXT
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,  -- 'approved' or 'rejected'
+                ts REAL,
+                original TEXT,
+                output TEXT,
+                tone_mode TEXT
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_corrections_lookup ON corrections(original_lower, tone_mode)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_events_kind ON events(kind, id)')
+        self.conn.commit()
+    
+    def _db_is_empty(self):
+        return self.conn.execute('''
+            SELECT NOT EXISTS (SELECT 1 FROM corrections)
+               AND NOT EXISTS (SELECT 1 FROM rules)
+               AND NOT EXISTS (SELECT 1 FROM events)
+        ''').fetchone()[0]
+    
+    @staticmethod
+    def _entry_ts(entry):
+        """Epoch time of an entry ('ts', or an ISO 'timestamp' in older files)"""
+        if 'ts' in entry:
+            return entry['ts']
+        try:
+            return datetime.fromisoformat(entry['timestamp']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            return None
+    
+    def _migrate_json(self, data):
+        """One-time import of an existing JSON memory file"""
+        with self.conn:
+            for correction in data['corrections']:
+                self._insert_correction(correction)
+            for rule_key in data['rules']:
+                self._upsert_rule(rule_key, data['rules'][rule_key])
+            for kind in ('approved', 'rejected'):
+                for entry in data[kind]:
+                    self._insert_event(kind, entry)
+        print(f"✓ Migrated {self.memory_file} to {self.db_file}")
+    
+    def _load_from_db(self):
+        """Rebuild the in-memory view from the database"""
+        memory = {
+            'corrections': deque(maxlen=self.MAX_CORRECTIONS),
+            'rules': {},
+            'approved': deque(maxlen=self.MAX_FEEDBACK),
+            'rejected': deque(maxlen=self.MAX_FEEDBACK),
+            'accuracy_score': 0.0
+        }
+        for ts, original, system_output, user_correction, tone_mode in self.conn.execute(
+                'SELECT ts, original, system_output, user_correction, tone_mode FROM corrections ORDER BY id'):
+            memory['corrections'].append({
+                'ts': ts,
+                'original': original,
+                'system_output': system_output,
+                'user_correction': user_correction,
+                'tone_mode': tone_mode
+            })
+        # rowid order is insertion order (upserts keep the rowid)
+        for key, count, examples_json in self.conn.execute(
+                'SELECT key, count, examples_json FROM rules ORDER BY rowid'):
+            memory['rules'][key] = {'count': count, 'examples': json.loads(examples_json)}
+        for kind, ts, original, output, tone_mode in self.conn.execute(
+                'SELECT kind, ts, original, output, tone_mode FROM events ORDER BY id'):
+            entry = {'ts': ts, 'original': original, 'output': output, 'tone_mode': tone_mode}
+            if kind == 'rejected':
+                entry['needs_correction'] = True
+            memory[kind].append(entry)
+        
+        total_feedback = len(memory['approved']) + len(memory['rejected'])
+        if total_feedback > 0:
+            memory['accuracy_score'] = len(memory['approved']) / total_feedback
+        self._trim_db()
+        return memory
+    
+    def _trim_db(self):
+        """Drop database rows beyond the history caps"""
+        with self.conn:
+            self.conn.execute(
+                'DELETE FROM corrections WHERE id NOT IN (SELECT id FROM corrections ORDER BY id DESC LIMIT ?)',
+                (self.MAX_CORRECTIONS,)
+            )
+            for kind in ('approved', 'rejected'):
+                self.conn.execute(
+                    'DELETE FROM events WHERE kind = ? AND id NOT IN '
+                    '(SELECT id FROM events WHERE kind = ? ORDER BY id DESC LIMIT ?)',
+                    (kind, kind, self.MAX_FEEDBACK)
+                )
+    
+    def _insert_correction(self, entry):
+        self.conn.execute('''
+            INSERT INTO corrections (ts, original, original_lower, system_output, user_correction, tone_mode)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (self._entry_ts(entry), entry['original'], entry['original'].lower().strip(),
+              entry.get('system_output'), entry['user_correction'], entry['tone_mode']))
+    
+    def _upsert_rule(self, rule_key, rule_data):
+        tone_mode = rule_key.rsplit(':', 1)[-1] if ':' in rule_key else None
+        self.conn.execute('''
+            INSERT INTO rules (key, count, examples_json, tone_mode) VALUES (?, ?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET count = excluded.count, examples_json = excluded.examples_json
+        ''', (rule_key, rule_data['count'], json.dumps(rule_data['examples'], ensure_ascii=False), tone_mode))
+    
+    def _insert_event(self, kind, entry):
+        self.conn.execute(
+            'INSERT INTO events (kind, ts, original, output, tone_mode) VALUES (?, ?, ?, ?, ?)',
+            (kind, self._entry_ts(entry), entry.get('original'), entry.get('output'), entry.get('tone_mode'))
+        )
     
     def load_memory(self):
         """Load feedback memory from file"""
@@ -46,36 +236,79 @@ class FeedbackMemory:
         }
     
     def save_memory(self):
-        """Save feedback memory to file"""
-        with open(self.memory_file, 'w', encoding='utf-8') as f:
-            json.dump(self.memory, f, indent=2, ensure_ascii=False)
+        """Export feedback memory to the JSON file (the database is the live store)"""
+        # Write a temp file and swap it in so a crash can't truncate the export
+        tmp_file = self.memory_file + '.tmp'
+        snapshot = dict(self.memory)
+        for name in ('corrections', 'approved', 'rejected'):
+            snapshot[name] = list(snapshot[name])
+        if ORJSON_AVAILABLE:
+            data = orjson.dumps(snapshot, option=orjson.OPT_NON_STR_KEYS)
+        else:
+            data = json.dumps(snapshot, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_file, self.memory_file)
+    
+    def close(self):
+        """Close the database connection"""
+        if self.conn:
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
     
     def add_correction(self, original, system_output, user_correction, tone_mode):
         """Store a user correction"""
         correction_entry = {
-            'timestamp': datetime.now().isoformat(),
+            'ts': time.time(),
             'original': original,
             'system_output': system_output,
             'user_correction': user_correction,
             'tone_mode': tone_mode
         }
-        self.memory['corrections'].append(correction_entry)
+        corrections = self.memory['corrections']
+        evicted = corrections[0] if len(corrections) == corrections.maxlen else None
+        corrections.append(correction_entry)
+        if evicted is not None:
+            self._unindex_correction(evicted)
+        self._index_correction(correction_entry)
         
         # Try to extract rules
-        self._extract_rules(original, system_output, user_correction, tone_mode)
-        self.save_memory()
+        changed_rules = self._extract_rules(original, system_output, user_correction, tone_mode)
+        with self.conn:
+            if evicted is not None:
+                self.conn.execute('DELETE FROM corrections WHERE id = (SELECT MIN(id) FROM corrections)')
+            self._insert_correction(correction_entry)
+            for rule_key in changed_rules:
+                self._upsert_rule(rule_key, self.memory['rules'][rule_key])
         print(f"✓ Feedback stored: {len(self.memory['corrections'])} total corrections")
     
+    def _index_correction(self, correction):
+        """Add a correction to the exact-match index"""
+        key = (correction['original'].lower().strip(), correction['tone_mode'])
+        self._exact_index.setdefault(key, deque()).append(correction['user_correction'])
+    
+    def _unindex_correction(self, correction):
+        """Remove an evicted (always the oldest) correction from the index"""
+        key = (correction['original'].lower().strip(), correction['tone_mode'])
+        entries = self._exact_index[key]
+        entries.popleft()
+        if not entries:
+            del self._exact_index[key]
+    
     def _extract_rules(self, original, system_output, user_correction, tone_mode):
-        """Extract transformation rules from corrections"""
+        """Extract transformation rules from corrections; returns the changed rule keys"""
         # Simple word-level rule extraction
         original_words = original.lower().split()
         correction_words = user_correction.lower().split()
+        changed = []
         
         # Look for word replacements
         for i, word in enumerate(original_words):
             if i < len(correction_words) and word != correction_words[i]:
                 rule_key = f"{word}→{correction_words[i]}:{tone_mode}"
+                self._rules_dirty = True
+                changed.append(rule_key)
                 if rule_key not in self.memory['rules']:
                     self.memory['rules'][rule_key] = {'count': 0, 'examples': []}
                 self.memory['rules'][rule_key]['count'] += 1
@@ -84,55 +317,77 @@ class FeedbackMemory:
                         'original': original,
                         'correction': user_correction
                     })
+        return changed
     
     def check_memory(self, text, tone_mode):
         """Check if we have a learned correction for this input"""
         text_normalized = text.lower().strip()
         
         # Check exact matches first
-        for correction in self.memory['corrections']:
-            if (correction['original'].lower().strip() == text_normalized and 
-                correction['tone_mode'] == tone_mode):
-                return correction['user_correction']
+        exact = self._exact_index.get((text_normalized, tone_mode))
+        if exact:
+            return exact[0]
         
         # Apply learned rules
-        result = text
+        return apply_rule_matcher(self._get_rule_matcher(tone_mode), text)
+    
+    def _get_rule_matcher(self, tone_mode):
+        """Build (and cache) a single-pass matcher over the active rules"""
+        if self._rules_dirty:
+            self._automata.clear()
+            self._rules_dirty = False
+        if tone_mode in self._automata:
+            return self._automata[tone_mode]
+        
+        # Only rules seen 2+ times; the first rule for a word wins
+        replacements = {}
         for rule_key, rule_data in self.memory['rules'].items():
-            if rule_data['count'] >= 2:  # Only apply rules seen 2+ times
+            if rule_data['count'] >= 2:
                 parts = rule_key.split(':')
                 if len(parts) == 2 and parts[1] == tone_mode:
                     word_rule = parts[0].split('→')
-                    if len(word_rule) == 2:
-                        from_word, to_word = word_rule
-                        result = result.replace(from_word, to_word)
+                    if len(word_rule) == 2 and word_rule[0]:
+                        replacements.setdefault(word_rule[0], word_rule[1])
         
-        return result if result != text else None
+        matcher = build_rule_matcher(replacements)
+        self._automata[tone_mode] = matcher
+        return matcher
+    
+    def _append_event(self, kind, entry):
+        """Record an approve/reject event, dropping the oldest past the cap"""
+        history = self.memory[kind]
+        full = len(history) == history.maxlen
+        history.append(entry)
+        with self.conn:
+            if full:
+                self.conn.execute(
+                    'DELETE FROM events WHERE id = (SELECT MIN(id) FROM events WHERE kind = ?)', (kind,)
+                )
+            self._insert_event(kind, entry)
     
     def approve_output(self, original, output, tone_mode):
         """User approves the output - reinforces current behavior"""
         approval_entry = {
-            'timestamp': datetime.now().isoformat(),
+            'ts': time.time(),
             'original': original,
             'output': output,
             'tone_mode': tone_mode
         }
-        self.memory['approved'].append(approval_entry)
+        self._append_event('approved', approval_entry)
         self._update_accuracy_score()
-        self.save_memory()
         print(f"✓ Output approved! Accuracy: {self.memory['accuracy_score']:.1%}")
     
     def reject_output(self, original, output, tone_mode):
         """User rejects the output - marks for improvement"""
         rejection_entry = {
-            'timestamp': datetime.now().isoformat(),
+            'ts': time.time(),
             'original': original,
             'output': output,
             'tone_mode': tone_mode,
             'needs_correction': True
         }
-        self.memory['rejected'].append(rejection_entry)
+        self._append_event('rejected', rejection_entry)
         self._update_accuracy_score()
-        self.save_memory()
         print(f"✗ Output rejected. Accuracy: {self.memory['accuracy_score']:.1%}")
         return rejection_entry
     
@@ -140,35 +395,13 @@ class FeedbackMemory:
     
     def get_simple_correction(self, text, tone_mode):
         """Simple rule-based correction as fallback"""
-        result = text
-        
-        # Basic tone transformations
-        if tone_mode == 'formal':
-            replacements = {
-                'gotta': 'must',
-                'wanna': 'want to',
-                'gonna': 'going to',
-                'yeah': 'yes',
-                'nope': 'no',
-                'hey': 'hello',
-                'dude': 'sir/madam',
-                'bruh': '',
-                'kinda': 'somewhat',
-                'sorta': 'somewhat'
-            }
-        elif tone_mode == 'casual':
-            replacements = {
-                'must': 'gotta',
-                'want to': 'wanna',
-                'going to': 'gonna'
-            }
-        else:
-            replacements = {}
-        
-        for old, new in replacements.items():
-            result = result.replace(old, new)
+        matcher = _SIMPLE_CORRECTION_RES.get(tone_mode)
+        if matcher is None:
+            return text.strip()
         
-        return result.strip()
+        # One pass over the text, whole words only
+        replacements = _SIMPLE_CORRECTIONS[tone_mode]
+        return matcher.sub(lambda m: replacements[m.group(0)], text).strip()
     
     def auto_improve(self, original, wrong_output, tone_mode):
         """Automatically improve using rule-based corrections"""
@@ -5,13 +5,109 @@ Fixes: word order, articles, verb forms, tense, punctuation, capitalization
 """
 
 import re
-from collections import defaultdict
+import threading
+from collections import OrderedDict, defaultdict
+
+
+# Patterns compiled once at import; each list is fused into a single pass below
+_DOUBLE_NEGATIVE_RULES = [
+    (re.compile(r"\bdon't\s+have\s+no\b", re.IGNORECASE), "don't have any"),
+    (re.compile(r"\bdidn't\s+have\s+no\b", re.IGNORECASE), "didn't have any"),
+    (re.compile(r"\bcan't\s+see\s+nothing\b", re.IGNORECASE), "can't see anything"),
+]
+
+_PREPOSITION_RULES = [
+    (re.compile(r'\bdifferent\s+than\b', re.IGNORECASE), 'different from'),
+    (re.compile(r'\bin\s+the\s+weekend\b', re.IGNORECASE), 'on the weekend'),
+    (re.compile(r'\bmarried\s+with\b', re.IGNORECASE), 'married to'),
+]
+
+_COMMON_MISTAKE_RULES = [
+    (re.compile(r'\bcould\s+of\b', re.IGNORECASE), 'could have'),
+    (re.compile(r'\bshould\s+of\b', re.IGNORECASE), 'should have'),
+    (re.compile(r'\bwould\s+of\b', re.IGNORECASE), 'would have'),
+    (re.compile(r'\balot\b', re.IGNORECASE), 'a lot'),
+    (re.compile(r'\byour\s+(going|coming|doing)\b', re.IGNORECASE), r"you're \1"),
+    (re.compile(r'\bits\s+(going|coming|doing)\b', re.IGNORECASE), r"it's \1"),
+    (re.compile(r'\btheir\s+(is|are|was|were)\b', re.IGNORECASE), r'there \1'),
+    (re.compile(r'\bthere\s+(going|coming)\b', re.IGNORECASE), r"they're \1"),
+]
+
+_CONTRACTION_RULES = [
+    (re.compile(r'\bI am\b'), "I'm"),
+    (re.compile(r'\byou are\b', re.IGNORECASE), "you're"),
+    (re.compile(r'\bhe is\b', re.IGNORECASE), "he's"),
+    (re.compile(r'\bshe is\b', re.IGNORECASE), "she's"),
+    (re.compile(r'\bit is\b', re.IGNORECASE), "it's"),
+    (re.compile(r'\bwe are\b', re.IGNORECASE), "we're"),
+    (re.compile(r'\bthey are\b', re.IGNORECASE), "they're"),
+]
+
+_CALENDAR_WORDS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday',
+                   'january', 'february', 'march', 'april', 'may', 'june',
+                   'july', 'august', 'september', 'october', 'november', 'december']
+_CALENDAR_RE = re.compile(r'\b(?:' + '|'.join(_CALENDAR_WORDS) + r')\b', re.IGNORECASE)
+
+
+def _fuse_rules(rules):
+    """Combine (pattern, replacement) rules into one single-pass substitution"""
+    alternatives = []
+    for i, (pattern, _) in enumerate(rules):
+        body = pattern.pattern
+        if pattern.flags & re.IGNORECASE:
+            body = '(?i:' + body + ')'
+        alternatives.append(f'(?P<r{i}>{body})')
+    combined = re.compile('|'.join(alternatives))
+    
+    def replace(match):
+        # lastgroup is the outer r<i> group of whichever rule matched
+        pattern, replacement = rules[int(match.lastgroup[1:])]
+        return pattern.sub(replacement, match.group(0))
+    
+    return lambda text: combined.sub(replace, text)
+
+
+_fix_double_negatives = _fuse_rules(_DOUBLE_NEGATIVE_RULES)
+_fix_prepositions = _fuse_rules(_PREPOSITION_RULES)
+_fix_common_mistakes = _fuse_rules(_COMMON_MISTAKE_RULES)
+_fix_contractions = _fuse_rules(_CONTRACTION_RULES)
+
+# Token sets for the word-level fixes
+_VOWEL_SOUNDS = frozenset({'a', 'e', 'i', 'o', 'u', 'hour', 'honest', 'honor'})
+_ARTICLES = frozenset({'a', 'an', 'the'})
+_NO_ADVERB_SWAP = frozenset({'am', 'is', 'are', 'was', 'were', 'have', 'has', 'had'})
+_THIRD_PERSON = frozenset({'he', 'she', 'it'})
+_NON_THIRD_PERSON = frozenset({'i', 'you', 'we', 'they'})
+_THIRD_PERSON_FORMS = {'have': 'has', 'do': 'does', 'go': 'goes'}
+_THIRD_PERSON_KEEP = frozenset({'is', 'was', 'has', 'does'})
+_BASE_FORMS = {'has': 'have', 'does': 'do', 'goes': 'go'}
+
+_CONJUNCTION_COMMA_RE = re.compile(r'\s+(and|but|or|so|yet)\s+')
+_CAP_AFTER_PUNCT_RE = re.compile(r'([.!?]\s+)([a-z])')
+_I_RE = re.compile(r'\bi\b')
+_SPACE_BEFORE_PUNCT_RE = re.compile(r' ([,.!?;:])')
+
+# Already-clean check: any rule trigger, or a letter whose case the pipeline
+# would change; the unnamed alternatives consume the capitals it produces
+_COMMON_MISTAKE_RE = re.compile('|'.join(pattern.pattern for pattern, _ in _COMMON_MISTAKE_RULES),
+                                re.IGNORECASE)
+_CASE_CHANGE_RE = re.compile(
+    r'(?:^|(?<=[.!?])\s+)[A-Z]|\bI\b|\b(?:' + '|'.join(w.capitalize() for w in _CALENDAR_WORDS) + r')\b'
+    r'|(?P<bad>(?:^|[.!?]\s+)[a-z]|\bi\b|(?i:\b(?:' + '|'.join(_CALENDAR_WORDS) + r')\b)|[A-Z])'
+)
 
 
 class GrammarProcessor:
+    # Streaming STT re-sends identical partials; remember this many results
+    CACHE_SIZE = 1024
+    
     def __init__(self):
         print("Initializing comprehensive rule-based grammar processor...")
         
+        # LRU of text -> corrected text
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
         # Common irregular verbs
         self.irregular_verbs = {
             'go': {'past': 'went', 'past_participle': 'gone', 'present_3rd': 'goes'},
@@ -24,159 +120,122 @@ class GrammarProcessor:
         }
         
         # Time expressions
-        self.time_words = ['today', 'tomorrow', 'yesterday', 'tonight', 'now', 'later', 
-                          'soon', 'morning', 'afternoon', 'evening', 'night', 'week', 
-                          'month', 'year', 'monday', 'tuesday', 'wednesday', 'thursday',
-                          'friday', 'saturday', 'sunday']
+        self.time_words = frozenset({'today', 'tomorrow', 'yesterday', 'tonight', 'now', 'later',
+                                     'soon', 'morning', 'afternoon', 'evening', 'night', 'week',
+                                     'month', 'year', 'monday', 'tuesday', 'wednesday', 'thursday',
+                                     'friday', 'saturday', 'sunday'})
         
         # Frequency adverbs
-        self.frequency_adverbs = ['always', 'usually', 'often', 'sometimes', 'rarely', 
-                                 'never', 'frequently', 'occasionally', 'seldom']
+        self.frequency_adverbs = frozenset({'always', 'usually', 'often', 'sometimes', 'rarely',
+                                            'never', 'frequently', 'occasionally', 'seldom'})
         
         print("Grammar processor initialized with comprehensive rules")
 
     def fix_articles(self, text):
         """Fix a/an article errors"""
-        vowel_sounds = ['a', 'e', 'i', 'o', 'u', 'hour', 'honest', 'honor']
         words = text.split()
-        fixed_words = []
+        lows = [word.lower() for word in words]
+        # Nothing to fix without an "a"/"an" token (set check runs in C)
+        if 'a' not in lows and 'an' not in lows:
+            return ' '.join(words)
+        fixed_words = list(words)
         
-        for i in range(len(words)):
-            word = words[i]
-            
-            if i > 0 and words[i-1].lower() == 'a':
-                next_word_lower = word.lower().strip('.,!?;:')
-                if next_word_lower and (next_word_lower[0] in 'aeiou' or next_word_lower in vowel_sounds):
-                    fixed_words[-1] = 'an' if words[i-1] == 'a' else 'An'
+        for i in range(1, len(words)):
+            prev_lower = lows[i-1]
             
-            elif i > 0 and words[i-1].lower() == 'an':
-                next_word_lower = word.lower().strip('.,!?;:')
-                if next_word_lower and next_word_lower[0] not in 'aeiou' and next_word_lower not in vowel_sounds:
-                    fixed_words[-1] = 'a' if words[i-1] == 'an' else 'A'
+            if prev_lower == 'a':
+                next_word_lower = lows[i].strip('.,!?;:')
+                if next_word_lower and (next_word_lower[0] in 'aeiou' or next_word_lower in _VOWEL_SOUNDS):
+                    fixed_words[i-1] = 'an' if words[i-1] == 'a' else 'An'
             
-            fixed_words.append(word)
+            elif prev_lower == 'an':
+                next_word_lower = lows[i].strip('.,!?;:')
+                if next_word_lower and next_word_lower[0] not in 'aeiou' and next_word_lower not in _VOWEL_SOUNDS:
+                    fixed_words[i-1] = 'a' if words[i-1] == 'an' else 'A'
         
         return ' '.join(fixed_words)
 
     def fix_word_order(self, text):
         """Fix common word order issues"""
         words = text.split()
+        lows = [word.lower() for word in words]  # kept in step with words
         
+        # Each pattern is skipped when no token can trigger it (the set
+        # checks run in C; swaps never change which words are present)
         # Pattern 1: "article + time_word + noun" -> "article + noun + time_word"
         # Example: "a tomorrow match" -> "a match tomorrow"
-        i = 0
-        while i < len(words) - 2:
-            if words[i].lower() in ['a', 'an', 'the']:
-                if words[i+1].lower() in self.time_words:
+        if not self.time_words.isdisjoint(lows):
+            for i in range(len(words) - 2):
+                if lows[i] in _ARTICLES and lows[i+1] in self.time_words:
                     # Found pattern: article + time + (next word is likely noun)
-                    if i + 2 < len(words):
-                        article = words[i]
-                        time_word = words[i+1]
-                        noun = words[i+2]
-                        # Reorder: article + noun + time
-                        words[i] = article
-                        words[i+1] = noun
-                        words[i+2] = time_word
-                        print(f"Fixed word order: '{article} {time_word} {noun}' -> '{article} {noun} {time_word}'")
-            i += 1
+                    article, time_word, noun = words[i], words[i+1], words[i+2]
+                    # Reorder: article + noun + time
+                    words[i+1], words[i+2] = noun, time_word
+                    lows[i+1], lows[i+2] = lows[i+2], lows[i+1]
+                    print(f"Fixed word order: '{article} {time_word} {noun}' -> '{article} {noun} {time_word}'")
         
         # Pattern 2: Frequency adverbs should come before main verb
         # "I go always" -> "I always go"
-        for i in range(1, len(words) - 1):
-            if words[i].lower() in self.frequency_adverbs:
-                # Check if previous word is a verb (not auxiliary)
-                if words[i-1].lower() not in ['am', 'is', 'are', 'was', 'were', 'have', 'has', 'had']:
-                    # Swap adverb with previous word
-                    words[i], words[i-1] = words[i-1], words[i]
+        if not self.frequency_adverbs.isdisjoint(lows):
+            for i in range(1, len(words) - 1):
+                if lows[i] in self.frequency_adverbs:
+                    # Check if previous word is a verb (not auxiliary)
+                    if lows[i-1] not in _NO_ADVERB_SWAP:
+                        # Swap adverb with previous word
+                        words[i], words[i-1] = words[i-1], words[i]
+                        lows[i], lows[i-1] = lows[i-1], lows[i]
         
         return ' '.join(words)
 
     def fix_subject_verb_agreement(self, text):
         """Fix subject-verb agreement"""
         words = text.split()
+        lows = [word.lower() for word in words]  # kept in step with words
+        # Only pronoun subjects trigger a fix (set checks run in C)
+        if _THIRD_PERSON.isdisjoint(lows) and _NON_THIRD_PERSON.isdisjoint(lows):
+            return ' '.join(words)
         
         for i in range(len(words) - 1):
-            subject = words[i].lower()
-            verb = words[i+1].lower()
+            subject = lows[i]
+            verb = lows[i+1]
             
             # Third person singular (he, she, it) needs 's' on verb
-            if subject in ['he', 'she', 'it']:
-                if verb == 'have':
-                    words[i+1] = 'has'
-                elif verb == 'do':
-                    words[i+1] = 'does'
-                elif verb == 'go':
-                    words[i+1] = 'goes'
-                elif verb not in ['is', 'was', 'has', 'does'] and not verb.endswith('s'):
+            if subject in _THIRD_PERSON:
+                if verb in _THIRD_PERSON_FORMS:
+                    words[i+1] = _THIRD_PERSON_FORMS[verb]
+                elif verb not in _THIRD_PERSON_KEEP and not verb.endswith('s'):
                     if not verb.endswith(('ss', 'sh', 'ch', 'x', 'z')):
                         words[i+1] = verb + 's'
+                lows[i+1] = words[i+1].lower()
             
             # Plural subjects (we, they, you, I) don't need 's'
-            elif subject in ['i', 'you', 'we', 'they']:
-                if verb == 'has':
-                    words[i+1] = 'have'
-                elif verb == 'does':
-                    words[i+1] = 'do'
-                elif verb == 'goes':
-                    words[i+1] = 'go'
+            elif subject in _NON_THIRD_PERSON:
+                if verb in _BASE_FORMS:
+                    words[i+1] = lows[i+1] = _BASE_FORMS[verb]
         
         return ' '.join(words)
 
     def fix_double_negatives(self, text):
         """Fix double negatives"""
         # "I don't have no" -> "I don't have any"
-        text = re.sub(r"\bdon't\s+have\s+no\b", "don't have any", text, flags=re.IGNORECASE)
-        text = re.sub(r"\bdidn't\s+have\s+no\b", "didn't have any", text, flags=re.IGNORECASE)
-        text = re.sub(r"\bcan't\s+see\s+nothing\b", "can't see anything", text, flags=re.IGNORECASE)
-        return text
+        return _fix_double_negatives(text)
 
     def fix_prepositions(self, text):
         """Fix common preposition errors"""
-        # "different than" -> "different from"
-        text = re.sub(r'\bdifferent\s+than\b', 'different from', text, flags=re.IGNORECASE)
-        
-        # "on the weekend" -> "on the weekend" or "at the weekend"
-        text = re.sub(r'\bin\s+the\s+weekend\b', 'on the weekend', text, flags=re.IGNORECASE)
-        
+        # "different than" -> "different from", "in the weekend" -> "on the weekend",
         # "married with" -> "married to"
-        text = re.sub(r'\bmarried\s+with\b', 'married to', text, flags=re.IGNORECASE)
-        
-        return text
+        return _fix_prepositions(text)
 
     def fix_common_mistakes(self, text):
         """Fix common grammar mistakes"""
-        # "could of" -> "could have"
-        text = re.sub(r'\bcould\s+of\b', 'could have', text, flags=re.IGNORECASE)
-        text = re.sub(r'\bshould\s+of\b', 'should have', text, flags=re.IGNORECASE)
-        text = re.sub(r'\bwould\s+of\b', 'would have', text, flags=re.IGNORECASE)
-        
-        # "alot" -> "a lot"
-        text = re.sub(r'\balot\b', 'a lot', text, flags=re.IGNORECASE)
-        
-        # "your" vs "you're"
-        text = re.sub(r'\byour\s+(going|coming|doing)\b', r"you're \1", text, flags=re.IGNORECASE)
-        
-        # "its" vs "it's"
-        text = re.sub(r'\bits\s+(going|coming|doing)\b', r"it's \1", text, flags=re.IGNORECASE)
-        
-        # "there" vs "their" vs "they're"
-        text = re.sub(r'\btheir\s+(is|are|was|were)\b', r'there \1', text, flags=re.IGNORECASE)
-        text = re.sub(r'\bthere\s+(going|coming)\b', r"they're \1", text, flags=re.IGNORECASE)
-        
-        return text
+        # "could of" -> "could have", "alot" -> "a lot", your/you're, its/it's,
+        # there/their/they're
+        return _fix_common_mistakes(text)
 
     def fix_contractions(self, text):
         """Fix missing contractions"""
         # "I am" -> "I'm" (optional, for natural speech)
-        text = re.sub(r'\bI am\b', "I'm", text)
-        text = re.sub(r'\byou are\b', "you're", text, flags=re.IGNORECASE)
-        text = re.sub(r'\bhe is\b', "he's", text, flags=re.IGNORECASE)
-        text = re.sub(r'\bshe is\b', "she's", text, flags=re.IGNORECASE)
-        text = re.sub(r'\bit is\b', "it's", text, flags=re.IGNORECASE)
-        text = re.sub(r'\bwe are\b', "we're", text, flags=re.IGNORECASE)
-        text = re.sub(r'\bthey are\b', "they're", text, flags=re.IGNORECASE)
-        
-        return text
+        return _fix_contractions(text)
 
     def add_punctuation(self, text):
         """Add proper punctuation"""
@@ -186,7 +245,7 @@ class GrammarProcessor:
         
         # Add comma before conjunctions in long sentences
         if len(text.split()) > 8:
-            text = re.sub(r'\s+(and|but|or|so|yet)\s+', r', \1 ', text)
+            text = _CONJUNCTION_COMMA_RE.sub(r', \1 ', text)
         
         return text
 
@@ -196,23 +255,15 @@ class GrammarProcessor:
         if text:
             text = text[0].upper() + text[1:] if len(text) > 1 else text.upper()
         
-        # Capitalize after sentence endings
-        text = re.sub(r'([.!?]\s+)([a-z])', lambda m: m.group(1) + m.group(2).upper(), text)
+        # Capitalize after sentence endings (only possible with a terminator)
+        if '.' in text or '!' in text or '?' in text:
+            text = _CAP_AFTER_PUNCT_RE.sub(lambda m: m.group(1) + m.group(2).upper(), text)
         
         # Capitalize "I"
-        text = re.sub(r'\bi\b', 'I', text)
+        text = _I_RE.sub('I', text)
         
         # Capitalize days and months
-        days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-        months = ['january', 'february', 'march', 'april', 'may', 'june', 
-                 'july', 'august', 'september', 'october', 'november', 'december']
-        
-        for day in days:
-            text = re.sub(r'\b' + day + r'\b', day.capitalize(), text, flags=re.IGNORECASE)
-        for month in months:
-            text = re.sub(r'\b' + month + r'\b', month.capitalize(), text, flags=re.IGNORECASE)
-        
-        return text
+        return _CALENDAR_RE.sub(lambda m: m.group(0).capitalize(), text)
 
     def correct_text(self, text: str) -> str:
         """
@@ -226,7 +277,43 @@ class GrammarProcessor:
         """
         if not text or len(text.strip()) == 0:
             return text
-
+        
+        # Well-formed input comes back unchanged; skip the pipeline and cache
+        if self.is_clean(text):
+            return text
+        
+        with self._cache_lock:
+            cached = self._cache.get(text)
+            if cached is not None:
+                self._cache.move_to_end(text)
+                return cached
+        
+        corrected = self._correct_text(text)
+        
+        with self._cache_lock:
+            self._cache[text] = corrected
+            if len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return corrected
+    
+    def is_clean(self, text: str) -> bool:
+        """True when correct_text would return text unchanged"""
+        if not text or text[-1] not in '.!?' or not text.isascii():
+            return False
+        # Spacing: single spaces only, none before punctuation
+        if ' '.join(text.split()) != text or _SPACE_BEFORE_PUNCT_RE.search(text):
+            return False
+        if text.count(' ') >= 8 and _CONJUNCTION_COMMA_RE.search(text):
+            return False
+        if _COMMON_MISTAKE_RE.search(text):
+            return False
+        for match in _CASE_CHANGE_RE.finditer(text):
+            if match.lastgroup == 'bad':
+                return False
+        return True
+    
+    def _correct_text(self, text: str) -> str:
+        """Uncached body of correct_text"""
         try:
             # SPEED-OPTIMIZED: Only critical corrections
             corrected = text.lower()
@@ -241,8 +328,8 @@ class GrammarProcessor:
             corrected = self.add_punctuation(corrected)
             
             # 4. Clean up spacing (single pass)
-            corrected = re.sub(r'\s+([,.!?;:])', r'\1', corrected)
-            corrected = re.sub(r'\s+', ' ', corrected).strip()
+            # (split/join collapses and strips; then only single spaces remain)
+            corrected = _SPACE_BEFORE_PUNCT_RE.sub(r'\1', ' '.join(corrected.split()))
             
             return corrected
             
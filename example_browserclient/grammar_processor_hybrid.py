@@ -3,8 +3,13 @@ Hybrid Grammar Processor - Combines fine-tuned T5 model with rule-based fallback
 Optimized for speed and accuracy
 """
 
+import os
+import queue
 import re
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
 from typing import Optional
 from grammar_processor import GrammarProcessor
 
@@ -16,6 +21,22 @@ except ImportError:
     TRANSFORMERS_AVAILABLE = False
     print("Warning: transformers not available, using rule-based only")
 
+try:
+    import ctranslate2
+    CTRANSLATE2_AVAILABLE = True
+except ImportError:
+    CTRANSLATE2_AVAILABLE = False
+
+try:
+    import bitsandbytes  # noqa: F401 - enables load_in_8bit on CUDA
+    BITSANDBYTES_AVAILABLE = True
+except ImportError:
+    BITSANDBYTES_AVAILABLE = False
+
+
+# Prompt echo left in model output: "grammar:" and/or a leading "grammar "
+_GRAMMAR_PREFIX_RE = re.compile(r'^(?:grammar:\s*)?(?:grammar\s+)?')
+
 
 class HybridGrammarProcessor:
     """
@@ -24,88 +45,266 @@ class HybridGrammarProcessor:
     2. Rule-based processor (fallback, fast)
     """
     
-    def __init__(self, model_path="../grammar-correction-model", use_model=True):
+    # Model corrections to remember (rule-based results are cached separately)
+    CACHE_SIZE = 1024
+    
+    # Micro-batching: up to BATCH_SIZE queued requests share one generate()
+    # call; the batcher waits at most BATCH_WAIT seconds to fill a batch
+    BATCH_SIZE = 8
+    BATCH_WAIT = 0.005
+    # CPU inference threads (torch intra-op / CTranslate2 intra_threads)
+    CPU_THREADS = min(4, os.cpu_count() or 1)
+    
+    def __init__(self, model_path="../grammar-correction-model", use_model=True, quantize=True,
+                 compile_model=True):
         """
         Initialize hybrid processor
         
         Args:
             model_path: Path to fine-tuned model
             use_model: Whether to use ML model (False = rule-based only)
+            quantize: Load the model with INT8 weights (False = full precision)
+            compile_model: Use a CTranslate2 conversion in {model_path}/ct2 if
+                present, else torch.compile the forward pass
         """
         print("Initializing Hybrid Grammar Processor...")
         
         # Always initialize rule-based processor (fallback)
         self.rule_based = GrammarProcessor()
         
+        # LRU of text -> model correction
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
         # Try to load ML model
         self.model = None
+        self.translator = None  # CTranslate2 replacement for self.model
+        self._eager_forward = None  # set while model.forward is compiled
         self.tokenizer = None
         self.device = "cpu"
-        self.model_available = False
+        self.model_available = False  # flipped by the loader thread when ready
+        self._model_ready = threading.Event()  # set once loading finishes either way
+        self._requests = None  # queue of (text, max_length, Future)
         
         if use_model and TRANSFORMERS_AVAILABLE:
-            try:
-                print(f"Loading fine-tuned model from {model_path}...")
-                start = time.time()
-                
-                self.tokenizer = AutoTokenizer.from_pretrained(model_path)
-                self.model = AutoModelForSeq2SeqLM.from_pretrained(model_path)
-                
-                # Use GPU if available
-                self.device = "cuda" if torch.cuda.is_available() else "cpu"
-                self.model.to(self.device)
-                self.model.eval()
-                
-                self.model_available = True
-                load_time = time.time() - start
-                print(f"✓ Model loaded in {load_time:.2f}s on {self.device}")
-                
-            except Exception as e:
-                print(f"✗ Could not load model: {e}")
-                print("✓ Falling back to rule-based processor")
+            # Load in the background; rule-based serves requests meanwhile
+            threading.Thread(
+                target=self._load_backend, args=(model_path, quantize, compile_model), daemon=True
+            ).start()
         else:
+            self._model_ready.set()
             print("✓ Using rule-based processor only")
     
-    def correct_with_model(self, text: str, max_length: int = 128) -> Optional[str]:
+    def _load_backend(self, model_path, quantize, compile_model):
+        """Load tokenizer and model, then switch correct_text over to the model"""
+        try:
+            print(f"Loading fine-tuned model from {model_path}...")
+            start = time.time()
+            
+            tokenizer = AutoTokenizer.from_pretrained(model_path)
+            
+            # Use GPU if available
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+            if self.device == "cpu":
+                self._tune_cpu_threads()
+            if compile_model:
+                self.translator = self._load_translator(model_path, quantize)
+            if self.translator is None:
+                self.model = self._load_model(model_path, quantize)
+                if compile_model:
+                    self._compile_model()
+            self.tokenizer = tokenizer
+            if self._eager_forward is not None:
+                # torch.compile compiles on first use: do it here, before
+                # model_available routes requests (with their timeout) to it
+                self._run_batch([("this is a warm up sentence", Future())], 128)
+            
+            self._requests = queue.Queue()
+            threading.Thread(target=self._batcher_loop, daemon=True).start()
+            self.model_available = True
+            load_time = time.time() - start
+            print(f"✓ Model loaded in {load_time:.2f}s on {self.device}")
+            
+        except Exception as e:
+            print(f"✗ Could not load model: {e}")
+            print("✓ Falling back to rule-based processor")
+        finally:
+            self._model_ready.set()
+    
+    def wait_for_model(self, timeout: Optional[float] = None) -> bool:
+        """Block until the background model load finishes; returns model_available"""
+        self._model_ready.wait(timeout)
+        return self.model_available
+    
+    def _tune_cpu_threads(self):
+        """Limit torch CPU threads; short sequences lose time to scheduling on many cores"""
+        torch.set_num_threads(self.CPU_THREADS)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # Can only be set before any inter-op work has started
+            pass
+    
+    def _load_model(self, model_path, quantize):
+        """Load the model on self.device, with INT8 weights when quantize is set"""
+        if quantize and self.device == "cuda" and BITSANDBYTES_AVAILABLE:
+            try:
+                model = AutoModelForSeq2SeqLM.from_pretrained(
+                    model_path, load_in_8bit=True, device_map={"": 0}
+                )
+                model.eval()
+                print("✓ Loaded INT8 weights (bitsandbytes)")
+                return model
+            except Exception as e:
+                print(f"✗ 8-bit load failed ({e}), using full precision")
+        
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_path)
+        model.config.use_cache = True  # reuse decoder key/values while generating
+        model.to(self.device)
+        model.eval()
+        if quantize and self.device == "cpu":
+            # Weight reads dominate CPU inference; INT8 Linear layers halve them
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            print("✓ Quantized Linear layers to INT8 (dynamic)")
+        return model
+    
+    def _load_translator(self, model_path, quantize):
+        """Load a CTranslate2 conversion of the model if one exists"""
+        ct2_path = os.path.join(model_path, "ct2")
+        if not (CTRANSLATE2_AVAILABLE and os.path.isdir(ct2_path)):
+            return None
+        compute_type = "default"
+        if quantize:
+            compute_type = "int8" if self.device == "cpu" else "int8_float16"
+        try:
+            translator = ctranslate2.Translator(ct2_path, device=self.device, compute_type=compute_type,
+                                                intra_threads=self.CPU_THREADS if self.device == "cpu" else 0)
+            print(f"✓ Using CTranslate2 model ({compute_type})")
+            return translator
+        except Exception as e:
+            print(f"✗ CTranslate2 load failed ({e}), using transformers")
+            return None
+    
+    def _compile_model(self):
+        """Compile the model's forward pass; generate() then calls the compiled version"""
+        if not hasattr(torch, "compile"):
+            return
+        try:
+            eager_forward = self.model.forward
+            # reduce-overhead means CUDA graphs; on CPU it only adds compile time
+            mode = "reduce-overhead" if self.device == "cuda" else "default"
+            self.model.forward = torch.compile(eager_forward, mode=mode)
+            self._eager_forward = eager_forward
+            print("✓ Compiled model with torch.compile")
+        except Exception as e:
+            print(f"✗ torch.compile failed ({e}), using eager mode")
+    
+    def correct_with_model(self, text: str, max_length: int = 128,
+                           timeout: Optional[float] = None) -> Optional[str]:
         """
-        Correct using fine-tuned model
+        Correct using fine-tuned model (requests are batched in the background)
         
         Returns:
-            Corrected text or None if model unavailable/fails
+            Corrected text or None if model unavailable/fails/times out
         """
         if not self.model_available or not text:
             return None
         
+        future = Future()
+        self._requests.put((text, max_length, future))
         try:
-            input_text = "grammar: " + text
-            inputs = self.tokenizer(
-                input_text,
-                return_tensors="pt",
-                max_length=max_length,
-                truncation=True
-            ).to(self.device)
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            # Nobody will read this result: if it's still queued, the
+            # batcher drops it instead of spending a generate() on it
+            future.cancel()
+            return None
+    
+    def _batcher_loop(self):
+        """Drain queued requests into batches and run them through the model"""
+        while True:
+            batch = [self._requests.get()]
+            deadline = time.monotonic() + self.BATCH_WAIT
+            while len(batch) < self.BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
             
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    **inputs,
-                    max_length=max_length,
-                    num_beams=2,  # Reduced for speed
-                    early_stopping=True,
-                    no_repeat_ngram_size=2
+            # Requests with different max_length can't share a generate() call;
+            # requests cancelled after timing out are skipped (setting a result
+            # on a cancelled future would raise and kill this thread)
+            groups = {}
+            for text, max_length, future in batch:
+                if future.set_running_or_notify_cancel():
+                    groups.setdefault(max_length, []).append((text, future))
+            for max_length, items in groups.items():
+                self._run_batch(items, max_length)
+    
+    def _generate(self, texts, max_length):
+        """Correct a batch of texts with one model call"""
+        if self.translator is not None:
+            tokens = [
+                self.tokenizer.convert_ids_to_tokens(
+                    self.tokenizer.encode("grammar: " + text, max_length=max_length, truncation=True)
                 )
-            
-            corrected = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            
-            # Clean up output - remove "grammar:" prefix if present
-            if corrected.startswith("grammar:"):
-                corrected = corrected[8:].strip()
-            corrected = re.sub(r'^grammar\s+', '', corrected)
-            
-            return corrected
-            
+                for text in texts
+            ]
+            results = self.translator.translate_batch(
+                tokens,
+                beam_size=2,  # Reduced for speed
+                max_decoding_length=max_length,
+                no_repeat_ngram_size=2
+            )
+            return [
+                self.tokenizer.decode(
+                    self.tokenizer.convert_tokens_to_ids(result.hypotheses[0]),
+                    skip_special_tokens=True
+                )
+                for result in results
+            ]
+        
+        inputs = self.tokenizer(
+            ["grammar: " + text for text in texts],
+            return_tensors="pt",
+            max_length=max_length,
+            truncation=True,
+            padding=True
+        ).to(self.device)
+        
+        with torch.inference_mode():
+            outputs = self.model.generate(
+                **inputs,
+                max_length=max_length,
+                num_beams=2,  # Reduced for speed
+                early_stopping=True,
+                no_repeat_ngram_size=2
+            )
+        
+        return self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+    
+    def _run_batch(self, items, max_length):
+        """Run one batched model call and resolve each request's future"""
+        try:
+            decoded = self._generate([text for text, _ in items], max_length)
         except Exception as e:
+            if self._eager_forward is not None:
+                # Compilation can fail lazily on first use: go eager and retry
+                print(f"✗ Compiled model failed ({e}), using eager mode")
+                self.model.forward = self._eager_forward
+                self._eager_forward = None
+                return self._run_batch(items, max_length)
             print(f"Model correction failed: {e}")
-            return None
+            for _, future in items:
+                future.set_result(None)
+            return
+        
+        for (_, future), corrected in zip(items, decoded):
+            # Clean up output - remove "grammar:" prefix if present
+            future.set_result(_GRAMMAR_PREFIX_RE.sub('', corrected, count=1).strip())
     
     def correct_text(self, text: str, timeout: float = 1.0) -> str:
         """
@@ -123,12 +322,23 @@ class HybridGrammarProcessor:
         
         # Try model first (if available)
         if self.model_available:
+            with self._cache_lock:
+                cached = self._cache.get(text)
+                if cached is not None:
+                    self._cache.move_to_end(text)
+                    return cached
+            
             start = time.time()
-            corrected = self.correct_with_model(text)
+            corrected = self.correct_with_model(text, timeout=timeout)
             elapsed = time.time() - start
             
             if corrected and elapsed < timeout:
-                # Model succeeded within timeout
+                # Model succeeded within timeout; timeouts/failures aren't
+                # cached so the model gets another try next time
+                with self._cache_lock:
+                    self._cache[text] = corrected
+                    if len(self._cache) > self.CACHE_SIZE:
+                        self._cache.popitem(last=False)
                 return corrected
             elif elapsed >= timeout:
                 print(f"Model timeout ({elapsed:.2f}s), using rule-based")
@@ -155,6 +365,7 @@ if __name__ == "__main__":
     
     # Initialize processors
     hybrid = HybridGrammarProcessor(use_model=True)
+    hybrid.wait_for_model()
     rule_based = GrammarProcessor()
     
     print(f"\nProcessor stats: {hybrid.get_stats()}\n")
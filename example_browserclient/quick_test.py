@@ -8,6 +8,7 @@ print("="*70 + "\n")
 
 # Initialize
 g = HybridGrammarProcessor()
+g.wait_for_model()
 print(f"Using: {'Hybrid (Model + Rules)' if g.model_available else 'Rules Only'}\n")
 
 # Test cases
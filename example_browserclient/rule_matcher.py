@@ -0,0 +1,65 @@
+"""
+Single-pass whole-word replacement for learned correction rules
+Shared by TranscriptionDatabase and FeedbackMemory
+"""
+import re
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+def build_rule_matcher(replacements):
+    """Compile a {from_word: to_word} dict into a matcher (None if empty)"""
+    if not replacements:
+        return None
+    if AHOCORASICK_AVAILABLE:
+        automaton = ahocorasick.Automaton()
+        for from_word, to_word in replacements.items():
+            automaton.add_word(from_word, (len(from_word), to_word))
+        automaton.make_automaton()
+        return ('ac', automaton)
+    alternation = '|'.join(map(re.escape, sorted(replacements, key=len, reverse=True)))
+    pattern = re.compile(r'(?<!\w)(?:' + alternation + r')(?!\w)')
+    return ('re', (pattern, replacements))
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+
+def apply_rule_matcher(matcher, text):
+    """Replace whole-word matches (leftmost-longest, one pass); None if unchanged"""
+    if matcher is None:
+        return None
+
+    kind, data = matcher
+    if kind == 're':
+        pattern, replacements = data
+        result = pattern.sub(lambda m: replacements[m.group(0)], text)
+    else:
+        # Keep hits that sit on word boundaries, then pick leftmost-longest
+        hits = []
+        for end, (length, to_word) in data.iter(text):
+            start = end - length + 1
+            if start > 0 and _is_word_char(text[start - 1]):
+                continue
+            if end + 1 < len(text) and _is_word_char(text[end + 1]):
+                continue
+            hits.append((start, -length, end + 1, to_word))
+        hits.sort()
+
+        parts = []
+        pos = 0
+        for start, _, stop, to_word in hits:
+            if start < pos:
+                continue
+            parts.append(text[pos:start])
+            parts.append(to_word)
+            pos = stop
+        parts.append(text[pos:])
+        result = ''.join(parts)
+
+    return result if result != text else None
@@ -5,21 +5,46 @@ if __name__ == '__main__':
     import websockets
     import threading
     import numpy as np
-    from scipy.signal import resample
+    from scipy.signal import firwin, resample_poly
     import json
     import logging
     import sys
     import csv
     import os
+    import struct
+    import time
+    from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
     from datetime import datetime
-    from fuzzywuzzy import fuzz
+    from functools import lru_cache
+    from math import gcd
+    try:
+        import orjson
+        def to_json(obj):
+            return orjson.dumps(obj).decode('utf-8')
+        # orjson parses str, bytes and memoryview slices without a copy
+        from_json = orjson.loads
+    except ImportError:
+        to_json = json.dumps
+        def from_json(data):
+            return json.loads(data if isinstance(data, str) else bytes(data))
+    try:
+        # Same API as fuzzywuzzy, C++ implementation
+        from rapidfuzz import fuzz
+    except ImportError:
+        from fuzzywuzzy import fuzz
     from grammar_processor import GrammarProcessor
     from tone_controller import ToneController
     from disfluency_filter import DisfluencyFilter
-    from auto_formatter import AutoFormatter
+    from auto_formatter import DEFAULT_FORMATTER
     from feedback_memory import FeedbackMemory
     from database import TranscriptionDatabase
     from paragraph_detector import ParagraphDetector
+    try:
+        # libuv-based event loop (not available on Windows)
+        import uvloop
+        UVLOOP_AVAILABLE = True
+    except ImportError:
+        UVLOOP_AVAILABLE = False
     
     # Try to import hybrid grammar processor (with fine-tuned model)
     try:
@@ -46,8 +71,12 @@ if __name__ == '__main__':
         print("📝 Initializing rule-based grammar processor...")
         grammar = GrammarProcessor()
     tone_controller = ToneController()
+    # Deterministic per (text, mode), and spoken phrases recur constantly
+    transform_tone = lru_cache(maxsize=2048)(tone_controller.transform)
     disfluency_filter = DisfluencyFilter()
-    auto_formatter = AutoFormatter()
+    clean_disfluencies = lru_cache(maxsize=2048)(disfluency_filter.clean_text)
+    auto_formatter = DEFAULT_FORMATTER
+    format_text = lru_cache(maxsize=2048)(auto_formatter.format_text)
     
     # Initialize paragraph detector
     # Note: 2s = paragraph break (continue recording), 5s = end transcription
@@ -75,34 +104,46 @@ if __name__ == '__main__':
     recorder_ready = threading.Event()
     client_websocket = None
     main_loop = None  # This will hold our primary event loop
+    outbox = None  # asyncio.Queue of outgoing message lists, drained by sender()
     
     # CSV log file for transcripts
     log_file = 'transcription_log.csv'
+    log_handle = None  # opened on first write and kept open
+    log_writer = None
+    # Rows are appended on their own thread so disk I/O stays off the
+    # utterance's latency path
+    log_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='csv-log')
     
-    def log_transcript(original, final, latency_ms, tone_mode):
-        """Log transcript to CSV file with timestamp and latency"""
+    def write_log_row(row):
+        """Append one row to the CSV log (header first if the file is new)"""
+        global log_handle, log_writer
         try:
-            file_exists = False
-            try:
-                with open(log_file, 'r'):
-                    file_exists = True
-            except FileNotFoundError:
-                pass
-            
-            with open(log_file, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                if not file_exists:
-                    writer.writerow(['Timestamp', 'Original', 'Final', 'Latency (ms)', 'Tone Mode'])
-                writer.writerow([
-                    datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    original,
-                    final,
-                    latency_ms,
-                    tone_mode
-                ])
+            if log_handle is None:
+                log_handle = open(log_file, 'a', newline='', encoding='utf-8')
+                log_writer = csv.writer(log_handle)
+                if log_handle.tell() == 0:
+                    log_writer.writerow(['Timestamp', 'Original', 'Final', 'Latency (ms)', 'Tone Mode'])
+            log_writer.writerow(row)
+            log_handle.flush()
         except Exception as e:
             print(f"Error logging to CSV: {e}")
+    
+    def log_transcript(original, final, latency_ms, tone_mode):
+        """Log transcript to CSV file with timestamp and latency"""
+        log_executor.submit(write_log_row, [
+            datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            original,
+            final,
+            latency_ms,
+            tone_mode
+        ])
+
+    @lru_cache(maxsize=2048)
+    def fuzzy_ratio(a: str, b: str) -> int:
+        """fuzz.ratio rounded like fuzzywuzzy (rapidfuzz returns a float)"""
+        return round(fuzz.ratio(a, b))
 
+    @lru_cache(maxsize=2048)  # ASR often repeats short utterances verbatim
     def dedupe_repetition(text: str, window=8, score_thresh=85) -> str:
         """
         Advanced deduplication to remove repeated phrases.
@@ -115,37 +156,52 @@ if __name__ == '__main__':
         if len(tokens) <= 1:
             return text
         
+        # Segments are slices of one lowered, single-spaced string: token j
+        # starts at offsets[j], and a k-token span ends one before offsets[j+k]
+        lowered = ' '.join(tokens).lower()
+        offsets = [0]
+        for token in lowered.split(' '):  # lower() can change a token's length
+            offsets.append(offsets[-1] + len(token) + 1)
         i = 0
         out_tokens = []
         N = len(tokens)
         removed_count = 0
         
         while i < N:
-            # Try larger windows first (more likely to be meaningful phrases)
-            w = min(window, N - i)
+            # Try larger windows first (more likely to be meaningful phrases);
+            # only windows whose repeat fits in the remaining tokens
+            ks = range(min(window, (N - i) // 2), 0, -1)
             found_repeat = False
             
-            for k in range(w, 0, -1):  # Start from largest window
-                if i + k > N:
+            start = offsets[i]
+            for k in ks:
+                # Check if next k tokens repeat
+                mid, end = offsets[i+k], offsets[i+2*k]
+                seg_len, next_len = mid - 1 - start, end - 1 - mid
+                # Skip pairs whose lengths alone rule out the threshold
+                # (best possible ratio is 100 * (1 - |l1 - l2| / (l1 + l2)))
+                total = seg_len + next_len
+                if round(100 * (total - abs(seg_len - next_len)) / total) < score_thresh:
                     continue
-                    
-                seg = ' '.join(tokens[i:i+k])
+                seg = lowered[start:mid-1]
+                next_seg = lowered[mid:end-1]
+                if seg == next_seg:
+                    # Exact repeat (the common ASR case): no scorer needed
+                    similarity = 100
+                else:
+                    # Use fuzzy match to handle ASR variations (cached: the
+                    # same n-gram pairs recur across utterances)
+                    similarity = fuzzy_ratio(seg, next_seg)
                 
-                # Check if next k tokens repeat
-                if i + k*2 <= N:
-                    next_seg = ' '.join(tokens[i+k:i+2*k])
-                    
-                    # Use fuzzy match to handle ASR variations
-                    similarity = fuzz.ratio(seg.lower(), next_seg.lower())
-                    
-                    if similarity >= score_thresh:
-                        # Found repetition - keep first occurrence, skip second
-                        out_tokens.extend(tokens[i:i+k])
-                        i += 2*k
-                        found_repeat = True
-                        removed_count += k
-                        print(f"🔄 Removed repetition: '{seg}' (similarity: {similarity}%)")
-                        break
+                if similarity >= score_thresh:
+                    # Found repetition - keep first occurrence, skip second
+                    seg = tokens[i:i+k]
+                    out_tokens.extend(seg)
+                    i += 2*k
+                    found_repeat = True
+                    removed_count += k
+                    print(f"🔄 Removed repetition: '{' '.join(seg)}' (similarity: {similarity}%)")
+                    break
             
             if not found_repeat:
                 out_tokens.append(tokens[i])
@@ -186,6 +242,33 @@ if __name__ == '__main__':
                 client_websocket = None
                 print("Client disconnected")
 
+    async def sender():
+        """Drain the outbox, coalescing whatever is queued into one frame"""
+        while True:
+            messages = await outbox.get()
+            # Anything posted while the previous send was in flight goes
+            # out with this one instead of costing its own frame
+            while not outbox.empty():
+                messages = messages + outbox.get_nowait()
+            try:
+                if len(messages) == 1:
+                    await send_to_client(to_json(messages[0]))
+                else:
+                    await send_to_client(to_json({'type': 'batch', 'messages': messages}))
+            except Exception as e:
+                # This task carries every outgoing message: lose this frame,
+                # not the sender
+                print(f"Error sending to client: {e}")
+
+    def send_messages(messages):
+        """Queue messages for the client from the recorder threads (sent in order)"""
+        if main_loop is not None:
+            main_loop.call_soon_threadsafe(outbox.put_nowait, list(messages))
+
+    def post_message(message):
+        """Queue a single message for the client"""
+        send_messages((message,))
+
     # Track accumulated text during recording
     accumulated_text = ""
     last_realtime_text = ""
@@ -195,11 +278,9 @@ if __name__ == '__main__':
         global main_loop, accumulated_text, last_realtime_text
         accumulated_text = ""
         last_realtime_text = ""
-        if main_loop is not None:
-            asyncio.run_coroutine_threadsafe(
-                send_to_client(json.dumps({
-                    'type': 'recording_started'
-                })), main_loop)
+        post_message({
+            'type': 'recording_started'
+        })
     
     # Called during recording for realtime transcription
     def on_realtime_transcription_update(text):
@@ -215,23 +296,19 @@ if __name__ == '__main__':
             last_realtime_text = text
             
             # Send realtime update with paragraph breaks
-            if main_loop is not None:
-                asyncio.run_coroutine_threadsafe(
-                    send_to_client(json.dumps({
-                        'type': 'realtime_update',
-                        'text': accumulated_text
-                    })), main_loop)
+            post_message({
+                'type': 'realtime_update',
+                'text': accumulated_text
+            })
     
     # Called when speech ends (processing begins)
     def recording_stopped():
         global main_loop, last_silence_duration
         
         # 5 second silence reached - end transcription
-        if main_loop is not None:
-            asyncio.run_coroutine_threadsafe(
-                send_to_client(json.dumps({
-                    'type': 'processing'
-                })), main_loop)
+        post_message({
+            'type': 'processing'
+        })
 
     recorder_config = {
         'spinner': False,
@@ -255,6 +332,165 @@ if __name__ == '__main__':
 
     recording_active = threading.Event()
     
+    MAX_LATENCY = 1.5  # Maximum allowed latency in seconds (for processing only)
+    GRAMMAR_TIMEOUT = 0.2  # Max time for grammar correction (reduced from 0.3s)
+    
+    # Post-processing runs here so the recorder thread can go straight back
+    # to listening; one worker keeps utterances (and their DB rows) in order
+    post_executor = ThreadPoolExecutor(max_workers=1)
+    # Long-lived grammar worker: correct_text runs here so it can be timed
+    # out without paying for a new thread per utterance
+    grammar_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='grammar')
+
+    def process_utterance(full_sentence, transcription_time, start_time):
+        """Clean up, correct and send one transcribed utterance"""
+        global current_transcription_id
+        try:
+            # Check for high-confidence learned corrections only
+            # Only apply if exact match with 3+ approvals
+            learned_output = None
+            exact_match = db.check_exact_match(full_sentence, current_tone_mode)
+            
+            if exact_match:
+                # Check if this correction has been approved multiple times
+                cursor = db.conn.cursor()
+                cursor.execute('''
+                    SELECT COUNT(*) as count FROM corrections
+                    WHERE LOWER(original_text) = LOWER(?) 
+                    AND corrected_output = ?
+                    AND tone_mode = ?
+                ''', (full_sentence, exact_match, current_tone_mode))
+                correction_count = cursor.fetchone()['count']
+                
+                # Only use if seen 3+ times (high confidence)
+                if correction_count >= 3:
+                    learned_output = exact_match
+                    print(f"🧠 High-confidence learned correction ({correction_count}x): {learned_output}")
+            
+            if learned_output:
+                # Use learned output
+                final_sentence = learned_output
+                total_time = time.time() - start_time
+                send_messages([
+                    {'type': 'stage', 'stage': 1, 'text': full_sentence},
+                    {'type': 'fullSentence', 'text': final_sentence},
+                    {'type': 'recording_complete', 'latency': int(total_time * 1000), 'learned': True}
+                ])
+                return
+            
+            # Apply deduplication to remove repetitions (optimized for speed)
+            dedup_start = time.time()
+            cleaned_sentence = dedupe_repetition(full_sentence, window=6, score_thresh=90)
+            print(f"⏱️ Deduplication: {time.time() - dedup_start:.3f}s")
+            
+            # Remove disfluencies and fillers (fast operation)
+            disfluency_start = time.time()
+            filtered_sentence = clean_disfluencies(cleaned_sentence)
+            print(f"⏱️ Disfluency filter: {time.time() - disfluency_start:.3f}s")
+            
+            # Calculate remaining time budget for processing
+            elapsed = time.time() - start_time
+            remaining_time = MAX_LATENCY - elapsed - 0.03  # Reserve 0.03s for final steps (reduced)
+            
+            if remaining_time <= 0.1:
+                # Not enough time left, skip grammar correction
+                final_sentence = filtered_sentence
+                corrected_sentence = filtered_sentence
+                toned_sentence = filtered_sentence
+                print(f"⚠️ Time budget exceeded ({elapsed:.3f}s), using filtered text")
+            else:
+                # Try to complete grammar correction within strict time budget
+                try:
+                    # Give grammar correction max 0.2s or remaining time, whichever is less
+                    grammar_timeout = min(GRAMMAR_TIMEOUT, remaining_time - 0.05)
+                    
+                    if grammar_timeout <= 0.05:
+                        # Not enough time, skip grammar
+                        corrected_sentence = filtered_sentence
+                        print(f"⚠️ Skipping grammar correction (no time left)")
+                    else:
+                        future = grammar_executor.submit(grammar.correct_text, filtered_sentence)
+                        corrected_sentence = future.result(timeout=grammar_timeout)
+                        print(f"After grammar: {corrected_sentence}")
+                except FuturesTimeoutError:
+                    # Drop the call if it is still queued behind an earlier
+                    # overrun; a running call can't be stopped and just finishes
+                    future.cancel()
+                    corrected_sentence = filtered_sentence
+                    print(f"⚠️ Grammar correction timeout ({grammar_timeout:.2f}s), using filtered text")
+                
+                # Apply tone transformation (fast operation)
+                tone_start = time.time()
+                toned_sentence = transform_tone(corrected_sentence, current_tone_mode)
+                print(f"After tone ({current_tone_mode}): {toned_sentence}")
+                print(f"⏱️ Tone: {time.time() - tone_start:.3f}s")
+                
+                # Apply auto-formatting (fast operation)
+                format_start = time.time()
+                formatted_sentence = format_text(toned_sentence, use_paragraphs=True)
+                print(f"After formatting: {formatted_sentence}")
+                print(f"⏱️ Formatting: {time.time() - format_start:.3f}s")
+                
+                # Apply paragraph detection based on silence duration
+                # Use the configured post_speech_silence_duration as a proxy
+                silence_duration = recorder_config['post_speech_silence_duration']
+                break_type = paragraph_detector.detect_break_type(silence_duration)
+                
+                if break_type == 'paragraph':
+                    final_sentence = paragraph_detector.format_text_with_breaks(formatted_sentence, 'paragraph')
+                    print(f"📄 Paragraph break detected ({silence_duration}s silence)")
+                elif break_type == 'sentence':
+                    final_sentence = paragraph_detector.format_text_with_breaks(formatted_sentence, 'sentence')
+                    print(f"📝 Sentence ending detected ({silence_duration}s silence)")
+                else:
+                    final_sentence = formatted_sentence
+            
+            if main_loop is not None:
+                total_time = time.time() - start_time
+                
+                # Warn if processing exceeded target
+                if total_time > MAX_LATENCY:
+                    print(f"⚠️ Processing exceeded {MAX_LATENCY}s target: {total_time:.3f}s")
+                
+                # Send every stage, the final result and the stop signal
+                # (with latency) in one frame; storage and logging
+                # happen after, off the client's latency
+                send_messages([
+                    {'type': 'stage', 'stage': 1, 'text': full_sentence},
+                    {'type': 'stage', 'stage': 2, 'text': cleaned_sentence},
+                    {'type': 'stage', 'stage': 3, 'text': filtered_sentence},
+                    {'type': 'stage', 'stage': 4, 'text': corrected_sentence},
+                    {'type': 'stage', 'stage': 5, 'text': toned_sentence},
+                    {'type': 'fullSentence', 'text': final_sentence},
+                    {'type': 'recording_complete', 'latency': int(total_time * 1000)}  # milliseconds
+                ])
+                
+                # Store in database
+                current_transcription_id = db.store_transcription({
+                    'original': full_sentence,
+                    'cleaned': cleaned_sentence,
+                    'filtered': filtered_sentence,
+                    'grammar_corrected': corrected_sentence,
+                    'tone_transformed': toned_sentence,
+                    'final_output': final_sentence,
+                    'tone_mode': current_tone_mode,
+                    'latency_ms': int(total_time * 1000),
+                    'transcription_time_ms': int(transcription_time * 1000),
+                    'processing_time_ms': int(total_time * 1000)
+                })
+                
+                # Log to CSV file (legacy)
+                log_transcript(full_sentence, final_sentence, int(total_time * 1000), current_tone_mode)
+            else:
+                total_time = time.time() - start_time
+            print(f"\rOriginal: {full_sentence}")
+            print(f"\rCleaned: {cleaned_sentence}")
+            print(f"\rFiltered: {filtered_sentence}")
+            print(f"\rFinal: {final_sentence}")
+            print(f"\r⏱️  Total processing time: {total_time:.3f}s")
+        except Exception as e:
+            print(f"Error processing utterance: {e}")
+
     def run_recorder():
         global recorder, main_loop, is_running
         print("Initializing RealtimeSTT...")
@@ -268,234 +504,55 @@ if __name__ == '__main__':
                 # Wait until recording is activated
                 recording_active.wait()
                 
-                import time
-                from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
-                
-                MAX_LATENCY = 1.5  # Maximum allowed latency in seconds (for processing only)
-                GRAMMAR_TIMEOUT = 0.2  # Max time for grammar correction (reduced from 0.3s)
-                
                 # Get transcription (not counted in latency)
                 transcription_start = time.time()
                 full_sentence = recorder.text()
                 transcription_time = time.time() - transcription_start
                 print(f"⏱️ Transcription: {transcription_time:.3f}s")
                 
-                # Start latency timer AFTER transcription
-                start_time = time.time()
-                
                 if full_sentence:
-                    # Check for high-confidence learned corrections only
-                    # Only apply if exact match with 3+ approvals
-                    learned_output = None
-                    exact_match = db.check_exact_match(full_sentence, current_tone_mode)
-                    
-                    if exact_match:
-                        # Check if this correction has been approved multiple times
-                        cursor = db.conn.cursor()
-                        cursor.execute('''
-                            SELECT COUNT(*) as count FROM corrections
-                            WHERE LOWER(original_text) = LOWER(?) 
-                            AND corrected_output = ?
-                            AND tone_mode = ?
-                        ''', (full_sentence, exact_match, current_tone_mode))
-                        correction_count = cursor.fetchone()['count']
-                        
-                        # Only use if seen 3+ times (high confidence)
-                        if correction_count >= 3:
-                            learned_output = exact_match
-                            print(f"🧠 High-confidence learned correction ({correction_count}x): {learned_output}")
-                    
-                    if learned_output:
-                        # Use learned output
-                        final_sentence = learned_output
-                        if main_loop is not None:
-                            asyncio.run_coroutine_threadsafe(
-                                send_to_client(json.dumps({
-                                    'type': 'stage',
-                                    'stage': 1,
-                                    'text': full_sentence
-                                })), main_loop)
-                            asyncio.run_coroutine_threadsafe(
-                                send_to_client(json.dumps({
-                                    'type': 'fullSentence',
-                                    'text': final_sentence
-                                })), main_loop)
-                            total_time = time.time() - start_time
-                            asyncio.run_coroutine_threadsafe(
-                                send_to_client(json.dumps({
-                                    'type': 'recording_complete',
-                                    'latency': int(total_time * 1000),
-                                    'learned': True
-                                })), main_loop)
-                        recording_active.clear()
-                        continue
-                    
-                    if main_loop is not None:
-                        # Send stage 1: Original transcription
-                        asyncio.run_coroutine_threadsafe(
-                            send_to_client(json.dumps({
-                                'type': 'stage',
-                                'stage': 1,
-                                'text': full_sentence
-                            })), main_loop)
-                    
-                    # Apply deduplication to remove repetitions (optimized for speed)
-                    dedup_start = time.time()
-                    cleaned_sentence = dedupe_repetition(full_sentence, window=6, score_thresh=90)
-                    print(f"⏱️ Deduplication: {time.time() - dedup_start:.3f}s")
-                    
-                    if main_loop is not None:
-                        # Send stage 2: After deduplication
-                        asyncio.run_coroutine_threadsafe(
-                            send_to_client(json.dumps({
-                                'type': 'stage',
-                                'stage': 2,
-                                'text': cleaned_sentence
-                            })), main_loop)
-                    
-                    # Remove disfluencies and fillers (fast operation)
-                    disfluency_start = time.time()
-                    filtered_sentence = disfluency_filter.clean_text(cleaned_sentence)
-                    print(f"⏱️ Disfluency filter: {time.time() - disfluency_start:.3f}s")
-                    
-                    if main_loop is not None:
-                        # Send stage 3: After filtering
-                        asyncio.run_coroutine_threadsafe(
-                            send_to_client(json.dumps({
-                                'type': 'stage',
-                                'stage': 3,
-                                'text': filtered_sentence
-                            })), main_loop)
-                    
-                    # Calculate remaining time budget for processing
-                    elapsed = time.time() - start_time
-                    remaining_time = MAX_LATENCY - elapsed - 0.03  # Reserve 0.03s for final steps (reduced)
-                    
-                    if remaining_time <= 0.1:
-                        # Not enough time left, skip grammar correction
-                        final_sentence = filtered_sentence
-                        corrected_sentence = filtered_sentence
-                        toned_sentence = filtered_sentence
-                        print(f"⚠️ Time budget exceeded ({elapsed:.3f}s), using filtered text")
-                    else:
-                        # Try to complete grammar correction within strict time budget
-                        with ThreadPoolExecutor(max_workers=1) as executor:
-                            try:
-                                # Give grammar correction max 0.2s or remaining time, whichever is less
-                                grammar_timeout = min(GRAMMAR_TIMEOUT, remaining_time - 0.05)
-                                
-                                if grammar_timeout <= 0.05:
-                                    # Not enough time, skip grammar
-                                    corrected_sentence = filtered_sentence
-                                    print(f"⚠️ Skipping grammar correction (no time left)")
-                                else:
-                                    future = executor.submit(grammar.correct_text, filtered_sentence)
-                                    corrected_sentence = future.result(timeout=grammar_timeout)
-                                    print(f"After grammar: {corrected_sentence}")
-                            except FuturesTimeoutError:
-                                corrected_sentence = filtered_sentence
-                                print(f"⚠️ Grammar correction timeout ({grammar_timeout:.2f}s), using filtered text")
-                        
-                        # Apply tone transformation (fast operation)
-                        tone_start = time.time()
-                        toned_sentence = tone_controller.transform(corrected_sentence, current_tone_mode)
-                        print(f"After tone ({current_tone_mode}): {toned_sentence}")
-                        print(f"⏱️ Tone: {time.time() - tone_start:.3f}s")
-                        
-                        # Apply auto-formatting (fast operation)
-                        format_start = time.time()
-                        formatted_sentence = auto_formatter.format_text(toned_sentence, use_paragraphs=True)
-                        print(f"After formatting: {formatted_sentence}")
-                        print(f"⏱️ Formatting: {time.time() - format_start:.3f}s")
-                        
-                        # Apply paragraph detection based on silence duration
-                        # Use the configured post_speech_silence_duration as a proxy
-                        silence_duration = recorder_config['post_speech_silence_duration']
-                        break_type = paragraph_detector.detect_break_type(silence_duration)
-                        
-                        if break_type == 'paragraph':
-                            final_sentence = paragraph_detector.format_text_with_breaks(formatted_sentence, 'paragraph')
-                            print(f"📄 Paragraph break detected ({silence_duration}s silence)")
-                        elif break_type == 'sentence':
-                            final_sentence = paragraph_detector.format_text_with_breaks(formatted_sentence, 'sentence')
-                            print(f"📝 Sentence ending detected ({silence_duration}s silence)")
-                        else:
-                            final_sentence = formatted_sentence
-                    
-                    if main_loop is not None:
-                        # Send stage 4: After grammar correction
-                        asyncio.run_coroutine_threadsafe(
-                            send_to_client(json.dumps({
-                                'type': 'stage',
-                                'stage': 4,
-                                'text': corrected_sentence
-                            })), main_loop)
-                        
-                        # Send stage 5: After tone transformation
-                        asyncio.run_coroutine_threadsafe(
-                            send_to_client(json.dumps({
-                                'type': 'stage',
-                                'stage': 5,
-                                'text': toned_sentence
-                            })), main_loop)
-                        
-                        # Send final result
-                        asyncio.run_coroutine_threadsafe(
-                            send_to_client(json.dumps({
-                                'type': 'fullSentence',
-                                'text': final_sentence
-                            })), main_loop)
-                        
-                        total_time = time.time() - start_time
-                        
-                        # Warn if processing exceeded target
-                        if total_time > MAX_LATENCY:
-                            print(f"⚠️ Processing exceeded {MAX_LATENCY}s target: {total_time:.3f}s")
-                        
-                        # Store in database
-                        global current_transcription_id
-                        current_transcription_id = db.store_transcription({
-                            'original': full_sentence,
-                            'cleaned': cleaned_sentence,
-                            'filtered': filtered_sentence,
-                            'grammar_corrected': corrected_sentence,
-                            'tone_transformed': toned_sentence,
-                            'final_output': final_sentence,
-                            'tone_mode': current_tone_mode,
-                            'latency_ms': int(total_time * 1000),
-                            'transcription_time_ms': int(transcription_time * 1000),
-                            'processing_time_ms': int(total_time * 1000)
-                        })
-                        
-                        # Log to CSV file (legacy)
-                        log_transcript(full_sentence, final_sentence, int(total_time * 1000), current_tone_mode)
-                        
-                        # Send stop signal to client with latency
-                        asyncio.run_coroutine_threadsafe(
-                            send_to_client(json.dumps({
-                                'type': 'recording_complete',
-                                'latency': int(total_time * 1000)  # Convert to milliseconds
-                            })), main_loop)
-                    else:
-                        total_time = time.time() - start_time
-                    print(f"\rOriginal: {full_sentence}")
-                    print(f"\rCleaned: {cleaned_sentence}")
-                    print(f"\rFiltered: {filtered_sentence}")
-                    print(f"\rFinal: {final_sentence}")
-                    print(f"\r⏱️  Total processing time: {total_time:.3f}s")
-                    # Stop recording after getting result
+                    # Stop recording after getting result; processing happens
+                    # on post_executor while we wait for the next recording
                     recording_active.clear()
+                    # Latency timer starts AFTER transcription
+                    post_executor.submit(process_utterance, full_sentence, transcription_time, time.time())
             except Exception as e:
                 print(f"Error in recorder thread: {e}")
                 continue
 
+    @lru_cache(maxsize=8)
+    def resample_ratio(original_sample_rate, target_sample_rate):
+        """Polyphase up/down factors and anti-aliasing FIR for a rate pair"""
+        divisor = gcd(original_sample_rate, target_sample_rate)
+        up = target_sample_rate // divisor
+        down = original_sample_rate // divisor
+        # Same filter resample_poly designs by default, built once per pair
+        max_rate = max(up, down)
+        fir = firwin(20 * max_rate + 1, 1.0 / max_rate, window=('kaiser', 5.0))
+        return up, down, fir
+
+    # Reused int16 output buffer for decode_and_resample (grown on demand)
+    resample_scratch = np.empty(8192, dtype=np.int16)
+
     def decode_and_resample(audio_data, original_sample_rate, target_sample_rate):
+        """Resample an int16 PCM chunk; the returned view is only valid until the next call"""
+        global resample_scratch
+        if original_sample_rate == target_sample_rate:
+            # Browser already sends 16 kHz: hand the bytes straight through
+            return audio_data
         try:
-            audio_np = np.frombuffer(audio_data, dtype=np.int16)
-            num_original_samples = len(audio_np)
-            num_target_samples = int(num_original_samples * target_sample_rate / original_sample_rate)
-            resampled_audio = resample(audio_np, num_target_samples)
-            return resampled_audio.astype(np.int16).tobytes()
+            audio_np = np.frombuffer(audio_data, dtype=np.int16)  # zero-copy view
+            # Polyphase FIR (48 kHz -> 16 kHz is up=1, down=3) instead of a
+            # per-chunk FFT
+            up, down, fir = resample_ratio(int(original_sample_rate), int(target_sample_rate))
+            resampled_audio = resample_poly(audio_np, up, down, window=fir)
+            n = len(resampled_audio)
+            if n > len(resample_scratch):
+                resample_scratch = np.empty(n, dtype=np.int16)
+            out = resample_scratch[:n]
+            np.copyto(out, resampled_audio, casting='unsafe')
+            # feed_audio copies this into its own bytearray right away
+            return memoryview(out).cast('B')
         except Exception as e:
             print(f"Error in resampling: {e}")
             return audio_data
@@ -504,6 +561,11 @@ if __name__ == '__main__':
         global client_websocket
         print("Client connected")
         client_websocket = websocket
+        # Length prefix + metadata of the last parsed audio frame; browsers
+        # repeat the same header on every frame, so it is parsed only when
+        # its bytes change
+        header = None
+        sample_rate = None
 
         try:
             async for message in websocket:
@@ -514,7 +576,7 @@ if __name__ == '__main__':
                 try:
                     # Check if it's a control message
                     if isinstance(message, str):
-                        control = json.loads(message)
+                        control = from_json(message)
                         if control.get('command') == 'start_recording':
                             recording_active.set()
                             print("Recording started by client")
@@ -536,7 +598,7 @@ if __name__ == '__main__':
                                     'latency': trans['latency_ms'],
                                     'timestamp': trans['timestamp']
                                 })
-                            await websocket.send(json.dumps({
+                            await websocket.send(to_json({
                                 'type': 'history_loaded',
                                 'history': history_data
                             }))
@@ -551,7 +613,7 @@ if __name__ == '__main__':
                             feedback_memory.approve_output(original, output, tone_mode)
                             
                             stats = db.get_stats()
-                            await websocket.send(json.dumps({
+                            await websocket.send(to_json({
                                 'type': 'feedback_received',
                                 'message': '✓ Good output! System reinforced.',
                                 'stats': stats
@@ -581,7 +643,7 @@ if __name__ == '__main__':
                                 # Store in database
                                 db.store_correction(original, wrong_output, correction, 'auto', tone_mode, current_transcription_id)
                                 stats = db.get_stats()
-                                await websocket.send(json.dumps({
+                                await websocket.send(to_json({
                                     'type': 'auto_improved',
                                     'correction': correction,
                                     'message': '🔧 Rule-based correction applied and system learned!',
@@ -590,7 +652,7 @@ if __name__ == '__main__':
                             else:
                                 stats = db.get_stats()
                                 error_message = '⚠️ Auto-correction unavailable. Please provide manual correction.'
-                                await websocket.send(json.dumps({
+                                await websocket.send(to_json({
                                     'type': 'auto_improve_failed',
                                     'message': error_message,
                                     'stats': stats
@@ -607,7 +669,7 @@ if __name__ == '__main__':
                             feedback_memory.add_correction(original, system_output, user_correction, tone_mode)
                             
                             stats = db.get_stats()
-                            await websocket.send(json.dumps({
+                            await websocket.send(to_json({
                                 'type': 'feedback_received',
                                 'message': '✓ Manual correction stored!',
                                 'stats': stats
@@ -618,14 +680,17 @@ if __name__ == '__main__':
                     if not recording_active.is_set():
                         continue
                     
-                    # Read the metadata length (first 4 bytes)
-                    metadata_length = int.from_bytes(message[:4], byteorder='little')
-                    # Get the metadata JSON string
-                    metadata_json = message[4:4+metadata_length].decode('utf-8')
-                    metadata = json.loads(metadata_json)
-                    sample_rate = metadata['sampleRate']
+                    # View the frame without copying; slices below are views too
+                    frame = memoryview(message)
+                    if header is None or not message.startswith(header):
+                        # Read the metadata length (first 4 bytes)
+                        (metadata_length,) = struct.unpack_from('<I', frame, 0)
+                        # Get the metadata JSON string
+                        metadata = from_json(frame[4:4+metadata_length])
+                        sample_rate = metadata['sampleRate']
+                        header = message[:4+metadata_length]
                     # Get the audio chunk following the metadata
-                    chunk = message[4+metadata_length:]
+                    chunk = frame[len(header):]
                     resampled_chunk = decode_and_resample(chunk, sample_rate, 16000)
                     recorder.feed_audio(resampled_chunk)
                 except Exception as e:
@@ -639,7 +704,9 @@ if __name__ == '__main__':
             recording_active.clear()
 
     async def main():
-        global main_loop
+        global main_loop, outbox
+        outbox = asyncio.Queue()
+        sender_task = asyncio.create_task(sender())
         main_loop = asyncio.get_running_loop()
 
         recorder_thread = threading.Thread(target=run_recorder)
@@ -648,12 +715,19 @@ if __name__ == '__main__':
         recorder_ready.wait()
 
         print("Server started. Press Ctrl+C to stop the server.")
-        async with websockets.serve(echo, "localhost", 8001):
+        # No permessage-deflate: the browser would otherwise compress every
+        # (incompressible) PCM frame and we'd inflate it again, and status
+        # messages are too small to gain from it
+        async with websockets.serve(echo, "localhost", 8001, compression=None):
             try:
                 await asyncio.Future()  # run forever
             except asyncio.CancelledError:
                 print("\nShutting down server...")
+            finally:
+                sender_task.cancel()
 
+    if UVLOOP_AVAILABLE:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
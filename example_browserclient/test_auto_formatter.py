@@ -0,0 +1,53 @@
+"""
+Test that the short-utterance path in AutoFormatter matches the full pipeline
+"""
+
+from auto_formatter import AutoFormatter
+
+print("="*70)
+print("AUTO FORMATTER SHORT-PATH TEST")
+print("="*70)
+print()
+
+formatter = AutoFormatter()
+
+
+def full_pipeline(text):
+    """format_text without the short-utterance shortcut"""
+    sentences = formatter.segment_sentences(formatter.clean_text(text))
+    sentences = formatter.capitalize_sentences(formatter.smart_punctuation(sentences))
+    if len(sentences) > 2:
+        return formatter.create_paragraphs(sentences)
+    return ' '.join(sentences)
+
+
+# Inputs without sentence terminators take the short path
+test_cases = [
+    "hello",
+    "  hello   world  ",
+    "what is your name",
+    "can you help me",
+    "wow that is amazing",
+    "i think i can do it",
+    "the meeting went fine, thanks,",
+    "so\tmany\nspaces here",
+    "é accents stay",
+]
+
+passed = 0
+failed = 0
+
+for text in test_cases:
+    fast = formatter.format_text(text)
+    full = full_pipeline(text)
+    if fast == full:
+        print(f"✅ {text!r} → {fast!r}")
+        passed += 1
+    else:
+        print(f"❌ {text!r}: short path {fast!r} != full pipeline {full!r}")
+        failed += 1
+
+print()
+print("="*70)
+print(f"RESULTS: {passed} passed, {failed} failed")
+print("="*70)
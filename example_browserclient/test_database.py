@@ -112,7 +112,18 @@ def test_database():
     export_file = db.export_learning_data('test_learning_data.json')
     print(f"   ✓ Exported to: {export_file}")
     
-    print("\n14. Testing learning persistence...")
+    print("\n14. Testing batched writes...")
+    with db:
+        for i in range(5):
+            db.store_feedback('approve', f'Batch {i}', f'Batch {i}.', 'neutral')
+    print(f"   ✓ Batch committed: {db.get_accuracy_stats()['approved']} approvals")
+    inserted = db.store_transcriptions_bulk([
+        {'original': f'bulk {i}', 'final_output': f'Bulk {i}.', 'tone_mode': 'neutral'}
+        for i in range(5)
+    ])
+    print(f"   ✓ Bulk stored {inserted} transcriptions")
+    
+    print("\n15. Testing learning persistence...")
     # Close and reopen database
     db.close()
     db2 = TranscriptionDatabase('test_transcription_data.db')
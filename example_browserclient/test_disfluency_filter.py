@@ -0,0 +1,84 @@
+"""
+Test stutter and filler removal in the disfluency filter
+"""
+
+from disfluency_filter import DisfluencyFilter
+
+print("="*70)
+print("DISFLUENCY FILTER TEST")
+print("="*70)
+print()
+
+dfilter = DisfluencyFilter()
+
+# Token pass must agree with the backreference pattern
+stutter_cases = [
+    "I I I think so",
+    "the the the dog ran",
+    "Store store STORE",
+    "store store store.",
+    "yes yes yes!",
+    "no no no no?",
+    "x x x.",
+    "x x x x?",
+    "go go",
+    "x, x x",
+    "x x, x x",
+    "we need need need to go go go now",
+]
+
+print("Testing remove_stutters against use_regex=True:\n")
+
+correct = 0
+total = len(stutter_cases)
+
+for text in stutter_cases:
+    expected = dfilter.remove_stutters(text, use_regex=True)
+    result = dfilter.remove_stutters(text)
+    status = "✓" if result == expected else "✗"
+    
+    if result == expected:
+        correct += 1
+    
+    print(f"{status} {text!r}")
+    print(f"   Expected: {expected!r}")
+    print(f"   Got:      {result!r}")
+    print()
+
+print("="*70)
+print(f"Accuracy: {correct}/{total} ({correct/total*100:.1f}%)")
+print("="*70)
+print()
+
+# The fused pass in clean_text must agree with the step-by-step pipeline
+# (compared case-insensitively: clean_text keeps the original casing)
+clean_cases = [
+    "yes yes yes!",
+    "store store store.",
+    "no no no no?",
+    "um so I I I mean it it it.",
+    "you know I think kind of like this",
+    "so. well, really really really good",
+]
+
+print("Testing clean_text against remove_stutters + remove_fillers:\n")
+
+correct = 0
+total = len(clean_cases)
+
+for text in clean_cases:
+    expected = dfilter.remove_fillers(dfilter.remove_stutters(text, use_regex=True))
+    result = dfilter.clean_text(text)
+    status = "✓" if result.lower() == expected.lower() else "✗"
+    
+    if result.lower() == expected.lower():
+        correct += 1
+    
+    print(f"{status} {text!r}")
+    print(f"   Expected: {expected!r}")
+    print(f"   Got:      {result!r}")
+    print()
+
+print("="*70)
+print(f"Accuracy: {correct}/{total} ({correct/total*100:.1f}%)")
+print("="*70)
@@ -70,7 +70,7 @@ def test_feedback_system():
     print("=" * 60)
     
     print("\n✅ All tests passed! Feedback system is working correctly.")
-    print("\nTo see the stored data, check: test_feedback_memory.json")
+    print("\nTo see the stored data, check: test_feedback_memory.db")
 
 if __name__ == '__main__':
     test_feedback_system()
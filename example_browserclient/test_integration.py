@@ -39,6 +39,7 @@ try:
     from grammar_processor_hybrid import HybridGrammarProcessor
     
     hybrid = HybridGrammarProcessor(use_model=True)
+    hybrid.wait_for_model()
     print(f"Stats: {hybrid.get_stats()}\n")
     
     for text in test_cases: